@@ -1,9 +1,40 @@
-from COGor.program_processor import em_processor
-from COGor.program_processor import om_processor
-from COGor.program_processor import batch_merger
-from COGor.program_processor import batch_splitter
-from COGor.program_processor import batch_processor
-from COGor.consensus import consensus
-from COGor.track_manager import get_track_template
-from COGor.consensus import get_features
-from COGor.track_manager import get_legend
+__version__ = "0.4"
+
+import importlib
+import sys
+import types
+
+# the public functions and the modules they are imported from on first use, so that 'import COGor' does not load
+# pandas, Biopython or PIL until they are needed
+_EXPORTS = {"em_processor": "program_processor", "om_processor": "program_processor",
+            "batch_merger": "program_processor", "batch_splitter": "program_processor",
+            "batch_processor": "program_processor", "consensus": "consensus", "get_track_template": "track_manager",
+            "get_features": "consensus", "get_legend": "track_manager", "run_pipeline": "pipeline"}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+    value = getattr(importlib.import_module(__name__ + "." + _EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+class _Package(types.ModuleType):
+    """
+    the package module, the exported functions are not replaced by the submodules of the same name
+    (COGor.consensus is the function consensus even after the module COGor.consensus is imported)
+    """
+    def __setattr__(self, name, value):
+        if name in _EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
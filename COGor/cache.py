@@ -0,0 +1,140 @@
+from functools import lru_cache
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from COGor import __version__
+from COGor.cog_index import COGS_FILE
+
+# default maximal size of the cache directory in bytes
+DEFAULT_MAX_SIZE = 1024 ** 3
+# the subdirectory with the track template and legends (see track_manager), it is not a stage entry and is never
+# evicted (it holds a few small files for each set of parameters)
+ASSET_DIR = "assets"
+
+
+def file_hash(file):
+    """
+    Compute SHA-256 hash of the file content, the file is read in chunks
+    """
+    sha = hashlib.sha256()
+    with open(file, "rb") as data:
+        for chunk in iter(lambda: data.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _cogs_hash():
+    return file_hash(COGS_FILE)
+
+
+def stage_key(stage, inputs, params=()):
+    """
+    Create the key of the pipeline stage from its name, content of its input files, its parameters,
+    version of the package and the COG definitions
+    :param stage: the name of the stage (em, om, batch, consensus)
+    :param inputs: list of paths to input files of the stage
+    :param params: other parameters that change the outputs of the stage
+    :return: key of the stage
+    """
+    sha = hashlib.sha256()
+    for part in [stage, __version__, _cogs_hash()] + [file_hash(file) for file in inputs] + [repr(params)]:
+        sha.update(part.encode())
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def cached_stage(stage, inputs, outputs, function, args, cache_dir, force=False, max_size=DEFAULT_MAX_SIZE,
+                 params=()):
+    """
+    Run the stage of the pipeline only if it has not been run with the same inputs before, otherwise the outputs are
+    restored from the cache directory (outputs that are already up to date are not touched)
+    :param stage: the name of the stage
+    :param inputs: list of paths to input files of the stage
+    :param outputs: list of paths to output files of the stage
+    :param function: the function that runs the stage
+    :param args: arguments of the function
+    :param cache_dir: the cache directory
+    :param force: run the stage even if its outputs are in the cache
+    :param max_size: maximal size of the cache directory in bytes, the least recently used stages are removed
+    :param params: other parameters that change the outputs of the stage
+    :return: True if the outputs were restored from the cache, False if the stage was run
+    """
+    entry = os.path.join(cache_dir, stage_key(stage, inputs, params))
+    if not force and _restore(entry, outputs):
+        return True
+
+    function(*args)
+    _store(entry, outputs)
+    evict(cache_dir, max_size)
+    return False
+
+
+def _restore(entry, outputs):
+    """
+    copy the outputs from the cache entry, return False if the entry does not exist
+    """
+    try:
+        with open(os.path.join(entry, "manifest.json"), "r") as file:
+            hashes = json.load(file)
+    except (OSError, ValueError):
+        return False
+    if len(hashes) != len(outputs):
+        return False
+
+    for index, (output, sha) in enumerate(zip(outputs, hashes)):
+        if not (os.path.isfile(output) and file_hash(output) == sha):
+            shutil.copyfile(os.path.join(entry, str(index)), output)
+    # mark the entry as recently used
+    os.utime(entry)
+    return True
+
+
+def _store(entry, outputs):
+    """
+    copy the outputs into new cache entry, the entry is created in temporary directory and then renamed
+    """
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    temp = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=".tmp-")
+    hashes = []
+    for index, output in enumerate(outputs):
+        shutil.copyfile(output, os.path.join(temp, str(index)))
+        hashes.append(file_hash(output))
+    with open(os.path.join(temp, "manifest.json"), "w") as file:
+        json.dump(hashes, file)
+
+    if os.path.isdir(entry):
+        shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.rename(temp, entry)
+    except OSError:
+        # the same entry has been stored by another process in the meantime
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def evict(cache_dir, max_size=DEFAULT_MAX_SIZE):
+    """
+    Remove the least recently used entries until the size of the cache directory is lower than max_size,
+    the asset directory is kept
+    :param cache_dir: the cache directory
+    :param max_size: maximal size of the cache directory in bytes
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(".tmp-") or name == ASSET_DIR or not os.path.isdir(path):
+            continue
+        try:
+            size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        except OSError:
+            continue
+
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
@@ -0,0 +1,54 @@
+from functools import lru_cache
+from importlib.resources import files
+
+# the packaged file with COGs and their functional categories
+COGS_FILE = str(files("COGor").joinpath("COGor-data").joinpath("cogs.txt"))
+
+# COGs that were renamed or merged in the COG 2020 update (old -> new)
+RENAMED_COGS = {"COG3512": "COG1343"}
+
+
+@lru_cache(maxsize=None)
+def load_cog_index(cogs_file=COGS_FILE):
+    """
+    Read the COG definitions (COGor-data/cogs.txt) once and index them by COG identifier
+    :param cogs_file: the path to tab separated file with COG and its functional categories, packaged file by default
+    :return: dictionary COG -> functional categories (e.g. {'COG0001': 'H', 'COG0008': 'J'})
+    """
+    index = {}
+    with open(cogs_file, "r") as file:
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) > 1 and fields[0]:
+                index[fields[0]] = fields[1]
+    return index
+
+
+def canonical_cog(cog):
+    """
+    Translate the renamed COG to its current identifier
+    """
+    return RENAMED_COGS.get(cog, cog)
+
+
+def get_category(cog, default=None):
+    """
+    Get the functional category of the COG, only the first (primary) letter is returned for multi-category COGs
+    :param cog: COG identifier
+    :param default: the value returned when the COG is not in the COG database (eggNOG OG, ROG, '-')
+    :return: functional category
+    """
+    categories = load_cog_index().get(canonical_cog(cog))
+    return categories[0] if categories else default
+
+
+def get_categories(cogs, default=None):
+    """
+    Batch version of get_category
+    :param cogs: iterable of COG identifiers
+    :param default: the value used for COGs that are not in the COG database
+    :return: list of functional categories in the same order as cogs
+    """
+    index = load_cog_index()
+    categories = [index.get(RENAMED_COGS.get(cog, cog)) for cog in cogs]
+    return [category[0] if category else default for category in categories]
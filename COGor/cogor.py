@@ -1,24 +1,49 @@
 import sys
 import getopt
-import program_processor
-import track_manager
-import consensus
 import os
 
+if __package__ in (None, ""):
+    # run as a script from the source tree (python cogor.py), the package is imported from the parent directory
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from COGor import runner
+from COGor import profiling
+from COGor import watcher
+import time
+
 
 def cogor():
     organism_name = None
     input_dir = os.getcwd()
     output_dir = os.getcwd()
     manager = False
+    manifest = None
+    discover = False
+    jobs = 1
+    parallel = False
+    cache_dir = None
+    force = False
+    max_cache_size = runner.DEFAULT_MAX_SIZE
+    compress = False
+    feature_types = ()
+    workers = 1
+    by_contig = False
+    metrics_file = None
+    cprofile_dir = None
+    cohort_dir = None
+    watch = False
+    interval = watcher.DEFAULT_INTERVAL
+    max_queue = watcher.DEFAULT_QUEUE_SIZE
+    status_file = None
 
     argv = sys.argv[1:]
 
     try:
-        opts, args = getopt.getopt(argv,"n:i:o:t")
+        opts, args = getopt.getopt(argv,"n:i:o:tm:aj:pc:fs:ze:w:rd:", ["profile=", "cprofile=", "watch", "interval=",
+                                                                   "queue-size=", "status="])
 
-    except:
-        print("Something wrong with the arguments")
+    except getopt.GetoptError as error:
+        print("Something wrong with the arguments: " + str(error))
         sys.exit(2)
 
     try:
@@ -32,36 +57,82 @@ def cogor():
             elif opt in ["-t"]:
                 if arg in ["true", "yes", "True", "t", ""]:
                     manager = True
+            elif opt in ["-m"]:
+                manifest = arg
+            elif opt in ["-a"]:
+                discover = True
+            elif opt in ["-j"]:
+                jobs = int(arg)
+            elif opt in ["-p"]:
+                parallel = True
+            elif opt in ["-c"]:
+                cache_dir = arg
+            elif opt in ["-f"]:
+                force = True
+            elif opt in ["-s"]:
+                max_cache_size = int(float(arg) * 1024 ** 2)
+            elif opt in ["-z"]:
+                compress = True
+            elif opt in ["-e"]:
+                feature_types = tuple(arg.split(","))
+            elif opt in ["-w"]:
+                workers = int(arg)
+            elif opt in ["-r"]:
+                by_contig = True
+            elif opt in ["-d"]:
+                cohort_dir = arg
+            elif opt in ["--profile"]:
+                metrics_file = arg
+            elif opt in ["--cprofile"]:
+                cprofile_dir = arg
+            elif opt in ["--watch"]:
+                watch = True
+            elif opt in ["--interval"]:
+                interval = float(arg)
+            elif opt in ["--queue-size"]:
+                max_queue = int(arg)
+            elif opt in ["--status"]:
+                status_file = arg
 
-    except:
-        print("Something wrong with the arguments")
+    except ValueError as error:
+        print("Something wrong with the arguments: " + str(error))
         sys.exit(2)
 
+    profiling.enable(metrics_file, cprofile_dir)
+
+    # Service mode: process the genomes arriving into the input directory until stopped
+    if watch:
+        watcher.watch(input_dir, output_dir, jobs=jobs, interval=interval, max_queue=max_queue,
+                      status_file=status_file, manager=manager, parallel=parallel, cache_dir=cache_dir, force=force,
+                      max_cache_size=max_cache_size, compress=compress, feature_types=feature_types, workers=workers,
+                      by_contig=by_contig, cohort_dir=cohort_dir)
+        return
+
+    # Batch mode: genomes from manifest or all genomes found in the input directory
+    if manifest or discover:
+        genomes = runner.read_manifest(manifest, input_dir, output_dir) if manifest else \
+            [(name, input_dir, output_dir + "/" + name) for name in runner.discover_genomes(input_dir)]
+        start = time.perf_counter()
+        results = runner.run_batch(genomes, jobs=jobs, manager=manager, parallel=parallel, cache_dir=cache_dir,
+                                   force=force, max_cache_size=max_cache_size, compress=compress,
+                                   feature_types=feature_types, workers=workers, by_contig=by_contig,
+                                   cohort_dir=cohort_dir)
+        print(runner.summary(results, time.perf_counter() - start))
+        if any(error is not None for name, seconds, error in results):
+            sys.exit(2)
+        return
+
     try:
-        # Program processor
-        program_processor.em_processor(organism_name,input_dir + "/" + organism_name + "_eggnog.gff", input_dir + "/" +
-                                       organism_name + "_cds.txt", output_dir)
-        program_processor.om_processor(organism_name, input_dir + "/" + organism_name + "_orf_operon.txt", input_dir +
-                                       "/" + organism_name + "_cog_operon.txt", output_dir)
-        program_processor.batch_processor(organism_name, input_dir + "/" + organism_name + "_batch.txt", output_dir)
-
-        # Consensus
-        consensus.consensus(output_dir + "/em_" + organism_name + ".gff",
-                            output_dir + "/om_" + organism_name + ".gff",
-                            output_dir + "/batch_" + organism_name + ".gff",
-                            input_dir + "/" + organism_name + ".fasta",
-                            get_pseudo=True, get_ncrna=True,
-                            gff_file=input_dir + "/" + organism_name + ".gff3",
-                            output_dir=output_dir)
-
-        # Track manager
-        if manager:
-            track_manager.get_track_template(output_dir=output_dir)
-            track_manager.get_legend(output_dir=output_dir)
-
-    except:
-        print("Something wrong with your files.")
+        runner.run_genome(organism_name, input_dir, output_dir, manager=manager, parallel=parallel, cache_dir=cache_dir,
+                          force=force, max_cache_size=max_cache_size, compress=compress,
+                          feature_types=feature_types, workers=workers, by_contig=by_contig, cohort_dir=cohort_dir)
+
+    except Exception as error:
+        print("Something wrong with your files: " + type(error).__name__ + ": " + str(error))
+        if metrics_file is not None:
+            print("See the details in " + metrics_file)
         sys.exit(2)
 
 
-cogor()
+if __name__ == "__main__":
+    cogor()
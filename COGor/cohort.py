@@ -0,0 +1,129 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from COGor.consensus import BRANCHES
+from COGor.writer import atomic_output
+
+# the tools in the order of consensus decision (see consensus.decide_tool)
+TOOLS = ("eggNOG-mapper", "Operon-mapper", "Batch CD-Search")
+# columns with repeated values stored as integer codes and the array of their values
+CODED_COLUMNS = ("seqname", "type", "COG", "CAT")
+STORE_SUFFIX = ".npz"
+
+
+def write_table(df, file):
+    """
+    Save the consensus table in the compact binary format (compressed NumPy .npz) with the columns seqname, type,
+    start, end, strand, COG, CAT, tool and agreement. Repeated strings are stored as integer codes.
+    :param df: consensus DataFrame (see consensus.consensus_table)
+    :param file: the path to output file (.npz)
+    """
+    arrays = {"start": df["start"].values.astype(np.int64), "end": df["end"].values.astype(np.int64),
+              "reverse": (df["strand"] == "-").values}
+    for column in CODED_COLUMNS:
+        codes, values = pd.factorize(df[column].astype(object).fillna("-") if column in df else
+                                     pd.Series("-", index=df.index))
+        arrays[column + "_codes"] = codes.astype(np.int32)
+        arrays[column + "_values"] = np.asarray(values, dtype=str)
+    tool = df["tool"] if "tool" in df else pd.Series(np.nan, index=df.index)
+    arrays["tool"] = tool.fillna(-1).values.astype(np.int8)
+    agreement = df["agreement"] if "agreement" in df else pd.Series(np.nan, index=df.index)
+    arrays["agreement"] = pd.Categorical(agreement, categories=BRANCHES).codes.astype(np.int8)
+
+    with atomic_output(file, False) as output:
+        np.savez_compressed(output, **arrays)
+
+
+def read_table(file):
+    """
+    Read the consensus table saved by write_table
+    :param file: the path to .npz file
+    :return: DataFrame with the columns seqname, type, start, end, strand, COG, CAT, tool (name of the tool, NaN
+    for features added from gff file) and agreement (see consensus.consensus_agreement)
+    """
+    with np.load(file) as arrays:
+        df = pd.DataFrame({column: pd.Categorical.from_codes(arrays[column + "_codes"], arrays[column + "_values"])
+                           for column in CODED_COLUMNS})
+        df.insert(2, "start", arrays["start"])
+        df.insert(3, "end", arrays["end"])
+        df.insert(4, "strand", np.where(arrays["reverse"], "-", "+"))
+        df["tool"] = pd.Categorical.from_codes(arrays["tool"], TOOLS)
+        df["agreement"] = pd.Categorical.from_codes(arrays["agreement"], BRANCHES)
+    return df
+
+
+def add_genome(store_dir, organism_name, consensus_data):
+    """
+    Add the consensus of the genome to the cohort store (directory with one .npz file per genome), the genome
+    already in the store is replaced. Genomes can be added by several processes at once.
+    :param store_dir: the cohort store directory
+    :param organism_name: the name of the genome in the store
+    :param consensus_data: consensus DataFrame or the path to the file saved by write_table
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    file = os.path.join(store_dir, organism_name + STORE_SUFFIX)
+    if isinstance(consensus_data, pd.DataFrame):
+        write_table(consensus_data, file)
+    else:
+        with open(consensus_data, "rb") as source, atomic_output(file, False) as output:
+            shutil.copyfileobj(source, output)
+
+
+def cohort_genomes(store_dir):
+    """
+    Get the names of genomes in the cohort store
+    :param store_dir: the cohort store directory
+    :return: sorted list of genome names
+    """
+    return sorted(file[:-len(STORE_SUFFIX)] for file in os.listdir(store_dir)
+                  if file.endswith(STORE_SUFFIX) and not file.startswith("."))
+
+
+def read_genome(store_dir, organism_name):
+    """
+    Read the consensus table of the genome from the cohort store, see read_table
+    """
+    return read_table(os.path.join(store_dir, organism_name + STORE_SUFFIX))
+
+
+def category_counts(store_dir, genomes=None, feature_type="CDS"):
+    """
+    Count the features of each COG functional category in each genome, only the needed arrays are read
+    :param store_dir: the cohort store directory
+    :param genomes: the names of genomes, all genomes in the store if None
+    :param feature_type: count only the features of this type (all features if None)
+    :return: DataFrame genomes x categories with the numbers of features
+    """
+    return _genome_matrix(store_dir, genomes, "CAT", feature_type).astype(np.int64)
+
+
+def cog_presence(store_dir, genomes=None, feature_type="CDS", cogs_only=True):
+    """
+    Create the presence/absence matrix of COGs in the genomes, features without COG ('-') are skipped
+    :param store_dir: the cohort store directory
+    :param genomes: the names of genomes, all genomes in the store if None
+    :param feature_type: use only the features of this type (all features if None)
+    :param cogs_only: only COGs (COGxxxx), other orthologous groups assigned by eggNOG-mapper are skipped
+    :return: DataFrame genomes x COGs with True if the COG is present in the genome
+    """
+    counts = _genome_matrix(store_dir, genomes, "COG", feature_type)
+    columns = [cog for cog in counts.columns if cog.startswith("COG")] if cogs_only else \
+        [cog for cog in counts.columns if cog != "-"]
+    return counts[columns] > 0
+
+
+def _genome_matrix(store_dir, genomes, column, feature_type):
+    """
+    count the values of the coded column in each genome
+    """
+    genomes = cohort_genomes(store_dir) if genomes is None else list(genomes)
+    rows = []
+    for organism_name in genomes:
+        with np.load(os.path.join(store_dir, organism_name + STORE_SUFFIX)) as arrays:
+            codes, values = arrays[column + "_codes"], arrays[column + "_values"]
+            if feature_type is not None:
+                codes = codes[arrays["type_values"][arrays["type_codes"]] == feature_type]
+            rows.append(pd.Series(np.bincount(codes, minlength=len(values)), index=values))
+    matrix = pd.DataFrame(rows, index=pd.Index(genomes, name="genome")).fillna(0)
+    return matrix[sorted(matrix.columns)]
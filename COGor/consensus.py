@@ -1,20 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from re import split
 import os
+from COGor.program_processor import parse_attributes, CATEGORICAL_COLUMNS
+from COGor.writer import write_plot_file, write_contig_plot_files
+from COGor.readers import read_gff
+from COGor.matching import match_features, match_summary, DEFAULT_MIN_OVERLAP
+from COGor.profiling import profiled, count
 
+# the consensus branches of features according to the agreement of the tools' COGs (see consensus_branches)
+BRANCHES = ("all_agree", "two_agree", "conflict", "single_tool", "none")
 
-def read_file(file, cog_pos):
+
+def read_file(file):
     """
-    read processed file and get only location of feature and assigned COG
+    read processed file, the attribute is split into columns ID, COG, CAT, name and desc
     """
-    data = pd.read_csv(file, sep='\t')
-    attributes = [split(r"[=,;]", x) for x in list(data["attribute"])]
-    new_data = data[["start", "end"]]
-    new_data.insert(2, "COG", [og[cog_pos] for og in attributes], True)
-    return [data, new_data]
+    return parse_attributes(read_gff(file, header=True))
 
 
-def consensus(em_file, om_file, batch_file, fasta_file, get_pseudo=False, get_ncrna=False, gff_file=None, output_dir=os.getcwd()):
+def tool_cogs(data, positions):
+    """
+    get the COGs assigned by the tool to the matched features, '-' if the tool did not predict the feature
+    :param data: the processed table of the tool
+    :param positions: positions of the matched features in the table (-1 if missing)
+    :return: Series with COGs
+    """
+    if len(data) == 0:
+        return pd.Series("-", index=positions.index, dtype=object)
+    cogs = data["COG"].astype(object).fillna("-").values
+    return pd.Series(cogs[positions.clip(lower=0)], index=positions.index).where(positions >= 0, "-")
+
+
+def consensus(em_file, om_file, batch_file, fasta_file, get_pseudo=False, get_ncrna=False, gff_file=None, output_dir=os.getcwd(),
+              compress=False, feature_types=(), min_overlap=DEFAULT_MIN_OVERLAP, workers=1, by_contig=False,
+              table_file=None):
     """
     Improves the functional annotation of the bacterial genome using a consensus of three programs:
     eggNOG-mapper, Operon-mapper and Batch CD-Search. Function saves all predicted features and COG assignments
@@ -27,92 +47,212 @@ def consensus(em_file, om_file, batch_file, fasta_file, get_pseudo=False, get_nc
     :type get_pseudo: bool
     :type get_ncrna: bool
     :param gff_file: the path to gff file where all features are stored
+    :param compress: save gzipped file (file_to_plot.txt.gz)
+    :param feature_types: other feature types from gff_file to be added (e.g. ('tRNA', 'rRNA', 'tmRNA'))
+    :param min_overlap: the minimal overlap of features predicted by different tools to be considered the same feature
+    :param workers: the number of processes, contigs are split into shards processed in parallel if more than 1
+    :param by_contig: save one file per replicon (file_to_plot_<record id>.txt) instead of one file_to_plot.txt
+    :param table_file: the path to save also the consensus table in the compact binary format (see cohort.write_table)
     :return:  file with functional annotation of the bacterial genome
     """
-    # read eggnog_mapper file
-    [em_data, new_em_data] = read_file(em_file, 3)
-    # read operon_mapper file
-    [om_data, new_om_data] = read_file(om_file, 3)
-    # read batch cd search file
-    [batch_data, new_batch_data] = read_file(batch_file, 1)
-
-    # merge the three dataframes to save all predicted features into one dataframe
-    # cog_x = eggnog-mapper #cog_y = operon-operon-mapper #cog = batch cd-search
-    new_df = pd.merge(new_em_data, new_om_data, on="start", how="outer")
-    new_df = (pd.merge(new_df, new_batch_data, on="start", how="outer")).fillna("-")
-
-    # create new DataFrame to store the necessary information
-    df = pd.DataFrame(columns=["seqname", "source", "type", "start", "end", "score", "strand", "frame", "attribute"])
-
-    # iterate through features
-    for row in new_df.index:
-        # get assigned COGs, number of NaN and start of the feature
-        cogs = [new_df["COG_x"][row], new_df["COG_y"][row], new_df["COG"][row]]
-        nan = cogs.count("-")
-        start = new_df["start"][row]
-        # find out which tools match in the COG assignment
-        idxs = [[cogs[:idx].index(item), idx] for idx, item in enumerate(cogs) if
-                item in cogs[:idx]]
-
-        # if all three tools have assigned the COG
-        if nan == 0:
-            # if all three tools match in assignment, add eggnog-mapper
-            if len(idxs) != 1:
-                df = pd.concat([df, em_data.loc[em_data.start == start, :]], ignore_index=True)
-
-            # two tools match in assignment
-            else:
-                #  if eggnog and batch or operon -> add eggnog, if operon and batch -> add operon
-                df = pd.concat([df, om_data.loc[om_data.start == start, :]], ignore_index=True) if idxs[0] == [1, 2] \
-                    else pd.concat([df, em_data.loc[em_data.start == start, :]], ignore_index=True)
-
-        # if only one tool has assigned the COG
-        elif nan == 2:
-            # find out which one was it and add it
-            which = [number for number in [0, 1, 2] if number not in idxs[0]][0]
-            programs = ['em_data', 'om_data', 'batch_data']
-            df = pd.concat([df, (locals()[programs[which]]).loc[(locals()[programs[which]]).start == start, :]],
-                           ignore_index=True)
-
-        # if two tools have assigned the COG
-        elif nan == 1:
-            nan_position = cogs.index("-")
-            # add eggnog-mapper or operon-mapper
-            df = pd.concat([df, om_data.loc[om_data.start == start, :]], ignore_index=True) if nan_position == 0 else \
-                pd.concat([df, em_data.loc[em_data.start == start, :]],
-                          ignore_index=True)
-
-        # no tool has assigned the COG, either it is not assigned or it is not a CDS -> add operon-mapper
-        else:
-            df = pd.concat([df, om_data.loc[om_data.start == start, :]], ignore_index=True)
+    df = consensus_table(read_file(em_file), read_file(om_file), read_file(batch_file), get_pseudo, get_ncrna,
+                         gff_file, feature_types, min_overlap, workers)
+    if by_contig:
+        write_contig_plot_files(df, fasta_file, output_dir, compress)
+    else:
+        write_plot_file(df, fasta_file, output_dir + '/file_to_plot.txt' + ('.gz' if compress else ''))
+    if table_file is not None:
+        from COGor.cohort import write_table
+        write_table(df, table_file)
+
+
+@profiled("consensus")
+def consensus_table(em_data, om_data, batch_data, get_pseudo=False, get_ncrna=False, gff_file=None, feature_types=(),
+                    min_overlap=DEFAULT_MIN_OVERLAP, workers=1):
+    """
+    Consensus of the three programs in memory, see consensus
+    :param em_data: eggNOG-mapper processed table (see program_processor.em_table)
+    :param om_data: Operon-mapper processed table (see program_processor.om_table)
+    :param batch_data: Batch CD-Search processed table (see program_processor.batch_table)
+    :type get_pseudo: bool
+    :type get_ncrna: bool
+    :param gff_file: the path to gff file where all features are stored
+    :param feature_types: other feature types from gff_file to be added (e.g. ('tRNA', 'rRNA', 'tmRNA'))
+    :param min_overlap: the minimal overlap of features predicted by different tools (fraction of the longer one)
+    to be considered the same feature, features with the same start are always the same feature
+    :param workers: the number of processes, contigs are split into shards processed in parallel if more than 1
+    :return: DataFrame with functional annotation of the bacterial genome, the attribute is split into columns
+    ID, COG, CAT, name and desc (features added from gff_file keep their attribute column). The numbers of features
+    matched exactly, fuzzily and unmatched are stored in df.attrs["matching"] and the numbers of features in each
+    consensus branch in df.attrs["branches"].
+    """
+    tools_data = [em_data, om_data, batch_data]
+    if workers > 1:
+        df, summary = _sharded_consensus(tools_data, min_overlap, workers)
+    else:
+        df, summary = _consensus_features(tools_data, min_overlap)
+    count(features=len(df), **summary["matching"], **summary["branches"])
 
     # add pseudogenes and/or ncRNA
-    if get_pseudo or get_ncrna:
-        df = get_features(gff_file, df, get_pseudo, get_ncrna)
+    if get_pseudo or get_ncrna or feature_types:
+        df = get_features(gff_file, df, get_pseudo, get_ncrna, feature_types)
+    df.attrs.update(summary)
+    return df
 
-    # save the created dataframe into new file and add genomic sequence
-    df.to_csv(output_dir + '/file_to_plot.txt', sep='\t', index=False, header=False)
-    fasta_data = (open(fasta_file, "r")).read()
-    with open(output_dir + '/file_to_plot.txt', 'a') as my_file:
-        my_file.write('\n' + fasta_data)
-    my_file.close()
+
+def _consensus_features(tools_data, min_overlap):
+    """
+    match the features of the tools, decide which tool is used for each feature and gather the features
+    :return: DataFrame with the chosen features and dictionary with the numbers of features matched exactly, fuzzily
+    and unmatched (matching) and the numbers of features in each consensus branch (branches)
+    """
+    # match the features of the three tools by contig, strand and overlap to save all predicted features
+    new_df = match_features(tools_data, min_overlap)
+
+    # decide which tool's feature is used for each row and gather the features from the tools' tables
+    cogs = [tool_cogs(data, new_df[tool]) for tool, data in enumerate(tools_data)]
+    new_df["tool"] = decide_tool(*cogs)
+    new_df["agreement"] = consensus_agreement(*cogs)
+    summary = {"matching": match_summary(new_df), "branches": consensus_branches(new_df["agreement"])}
+    return gather_features(new_df, tools_data), summary
+
+
+def _sharded_consensus(tools_data, min_overlap, workers):
+    """
+    run the consensus of each group of contigs in separate process and reassemble the results in the order of contigs
+    """
+    contigs = sorted(set().union(*[data["seqname"].astype(str) for data in tools_data]))
+    if not contigs:
+        return _consensus_features(tools_data, min_overlap)
+    shards = [list(shard) for shard in np.array_split(contigs, min(len(contigs), workers * 4)) if len(shard)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_consensus_features,
+                                [[data.loc[data["seqname"].astype(str).isin(shard)] for data in tools_data]
+                                 for shard in shards], [min_overlap] * len(shards)))
+
+    summary = {part: {key: sum(counts[part][key] for df, counts in results) for key in results[0][1][part]}
+               for part in ("matching", "branches")}
+    return concat_tables([df for df, counts in results]), summary
 
 
-def get_features(gff_file, df, get_pseudo, get_ncrna):
+def decide_tool(em_cog, om_cog, batch_cog):
+    """
+    Decide which tool's annotation is used for each feature according to the COGs assigned by the tools:
+    - all three tools have assigned the COG: eggNOG-mapper, unless only Operon-mapper and Batch CD-Search match
+    - two tools have assigned the COG: eggNOG-mapper, or Operon-mapper if eggNOG-mapper has not assigned it
+    - only one tool has assigned the COG: the tool which has assigned it
+    - no tool has assigned the COG (not assigned or not a CDS): Operon-mapper
+    :param em_cog: COGs assigned by eggNOG-mapper ('-' if not assigned)
+    :param om_cog: COGs assigned by Operon-mapper ('-' if not assigned)
+    :param batch_cog: COGs assigned by Batch CD-Search ('-' if not assigned)
+    :return: Series with the index of the chosen tool: 0 = eggNOG-mapper, 1 = Operon-mapper, 2 = Batch CD-Search
+    """
+    em_nan, om_nan, batch_nan = em_cog == "-", om_cog == "-", batch_cog == "-"
+    nan = em_nan.astype(int) + om_nan.astype(int) + batch_nan.astype(int)
+
+    use_om = ((nan == 0) & (om_cog == batch_cog) & (em_cog != om_cog)) | ((nan == 1) & em_nan) | \
+             ((nan == 2) & ~om_nan) | (nan == 3)
+    use_batch = (nan == 2) & ~batch_nan
+
+    tool = pd.Series(0, index=em_cog.index)
+    tool[use_om] = 1
+    tool[use_batch] = 2
+    return tool
+
+
+def consensus_agreement(em_cog, om_cog, batch_cog):
+    """
+    Decide the consensus branch of each feature according to the agreement of the COGs assigned by the tools:
+    all three tools assigned the same COG (all_agree), two tools assigned the same COG (two_agree), two or three tools
+    assigned different COGs (conflict), only one tool assigned the COG (single_tool) and no tool assigned the COG (none)
+    :param em_cog: COGs assigned by eggNOG-mapper ('-' if not assigned)
+    :param om_cog: COGs assigned by Operon-mapper ('-' if not assigned)
+    :param batch_cog: COGs assigned by Batch CD-Search ('-' if not assigned)
+    :return: categorical Series with the branch of each feature
+    """
+    assigned = (em_cog != "-").astype(int) + (om_cog != "-").astype(int) + (batch_cog != "-").astype(int)
+    em_om, em_batch, om_batch = (em_cog == om_cog) & (em_cog != "-"), (em_cog == batch_cog) & (em_cog != "-"), \
+        (om_cog == batch_cog) & (om_cog != "-")
+    all_agree = em_om & em_batch
+    two_agree = (em_om | em_batch | om_batch) & ~all_agree
+    branch = np.select([all_agree, two_agree, assigned >= 2, assigned == 1], BRANCHES[:4], BRANCHES[4])
+    return pd.Series(pd.Categorical(branch, categories=BRANCHES), index=em_cog.index)
+
+
+def consensus_branches(agreement):
+    """
+    Count the features in each consensus branch
+    :param agreement: the branches of the features (see consensus_agreement)
+    :return: dictionary with the numbers of features in each branch
+    """
+    counts = agreement.value_counts()
+    return {branch: int(counts.get(branch, 0)) for branch in BRANCHES}
+
+
+def gather_features(new_df, tools_data):
+    """
+    Gather the features from the tools' tables according to the decision made for each row of matched dataframe,
+    rows where the chosen tool did not predict the feature are skipped
+    :param new_df: matched dataframe (see matching.match_features) with column tool
+    :param tools_data: list of tools' tables (eggNOG-mapper, Operon-mapper, Batch CD-Search)
+    :return: DataFrame with the chosen features in the order of matched dataframe, the columns tool and agreement
+    (if present) of the matched dataframe are kept
+    """
+    gathered = []
+    kept = [column for column in ("tool", "agreement") if column in new_df]
+    for tool, data in enumerate(tools_data):
+        rows = new_df.index[(new_df["tool"] == tool) & (new_df[tool] >= 0)]
+        decision = {column: new_df.loc[rows, column].values for column in kept}
+        gathered.append(data.iloc[new_df.loc[rows, tool].values].assign(_row=rows, **decision))
+
+    df = concat_tables(gathered).sort_values("_row", kind="stable")
+    columns = dict.fromkeys([column for data in tools_data for column in data.columns] + kept)
+    return df[list(columns)].reset_index(drop=True)
+
+
+def concat_tables(tables):
+    """
+    Concatenate the tables, the categorical columns (COG and CAT) stay categorical with the union of the categories
+    (pandas would turn the columns with different categories into object columns)
+    :param tables: list of DataFrames
+    :return: DataFrame with new index
+    """
+    dtypes = {}
+    for column in CATEGORICAL_COLUMNS:
+        columns = [data[column].dtype for data in tables if column in data]
+        if columns and all(isinstance(dtype, pd.CategoricalDtype) for dtype in columns):
+            dtypes[column] = pd.CategoricalDtype(list(dict.fromkeys(category for dtype in columns
+                                                                    for category in dtype.categories)))
+    tables = [data.astype({column: dtype for column, dtype in dtypes.items() if column in data}) for data in tables]
+    # the columns missing in some tables are filled with NaN, which may not keep the dtype
+    return pd.concat(tables, ignore_index=True).astype(dtypes)
+
+
+@profiled("get_features")
+def get_features(gff_file, df, get_pseudo, get_ncrna, feature_types=()):
     """
     change the feature type to a pseudogene according to information in gff_file
-    and add ncRNA feature to the dataframe
+    and add ncRNA feature (and other requested features) to the dataframe
+    :param gff_file: the path to gff file where all features are stored
+    :param df: consensus dataframe
+    :type get_pseudo: bool
+    :type get_ncrna: bool
+    :param feature_types: other feature types to be added (e.g. ('tRNA', 'rRNA', 'tmRNA'))
+    :return: consensus dataframe with the features
     """
-    gff_file = pd.read_csv(gff_file, sep="\t", header=None, comment="#", names=("seqname", "source", "type", "start",
-                                                                                "end", "score", "strand", "frame",
-                                                                                "attribute"))
+    added_types = (["ncRNA"] if get_ncrna else []) + [feature for feature in feature_types if feature != "ncRNA"]
+    features = read_gff(gff_file, set(added_types + (["pseudogene"] if get_pseudo else [])))
+
     if get_pseudo:
-        pseudogenes = gff_file.loc[gff_file['type'] == 'pseudogene']
-        for row in pseudogenes.index:
-            start = pseudogenes.start[row]
-            df.loc[df['start'] == start, 'type'] = 'pseudogene'
-    if get_ncrna:
-        ncrnas = gff_file.loc[gff_file['type'] == 'ncRNA']
-        df = pd.concat([df,ncrnas], ignore_index=True)
+        # pseudogenes are matched by contig, start and strand
+        pseudogenes = features.loc[features['type'] == 'pseudogene', ["seqname", "start", "strand"]]
+        keys = pd.MultiIndex.from_frame(df[["seqname", "start", "strand"]].astype({"start": int}))
+        pseudo = keys.isin(pd.MultiIndex.from_frame(pseudogenes))
+        df.loc[pseudo, 'type'] = 'pseudogene'
+        count(pseudogenes=pseudo.sum())
+    if added_types:
+        added = features.loc[features['type'].isin(added_types)]
+        df = concat_tables([df, added])
+        count(added_features=len(added))
 
     return df
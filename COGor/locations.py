@@ -0,0 +1,69 @@
+from itertools import chain
+import re
+import numpy as np
+import pandas as pd
+
+# the location in NCBI header of CDS (e.g. [location=complement(join(<1..200,300..>400))])
+LOCATION_PATTERN = re.compile(r"\[location=([^\]]*)\]")
+# one segment of the location: optional <, start, optional ..>end (single base locations have no end)
+SEGMENT_PATTERN = re.compile(r"(<?)(\d+)(?:\.\.(>?)(\d+))?")
+# the most common location with one segment, parsed at once without searching for all segments
+SIMPLE_PATTERN = re.compile(r"(?:complement\()?(<?)(\d+)\.\.(>?)(\d+)\)?$")
+# joins of complement segments list the segments from the end of the feature, e.g. join(complement(200..300),
+# complement(1..100)) is the same as complement(join(1..100,200..300))
+COMPLEMENT_JOINS = ("join(complement(", "order(complement(")
+
+
+def header_locations(headers):
+    """
+    Get the locations from NCBI headers of CDSs
+    :param headers: Series with CDS headers
+    :return: Series with location strings, NaN if the header has no location
+    """
+    return headers.str.extract(LOCATION_PATTERN, expand=False)
+
+
+def parse_locations(locations):
+    """
+    Parse the NCBI locations of the whole column at once. Complement locations are on the reverse strand, joins are
+    split into segments, partial locations are marked by < (the first coordinate) and > (the last coordinate).
+    The start is the first coordinate and the end is the last coordinate of the location (the segments of
+    join(complement(...),complement(...)) are listed from the end of the feature and are reversed first).
+    :param locations: Series with location strings (e.g. complement(join(<1..200,300..400))), may contain NaN
+    :return: tuple of two DataFrames:
+    features with the same index as locations (rows without coordinates are skipped) and the columns start, end
+    (int64), strand ('+' or '-'), partial_start, partial_end (bool) and segments (int64, the number of segments),
+    segments with the columns feature (the index of the feature in locations), start and end (int64),
+    one row per segment in the order of the locations (from the start to the end of each feature)
+    """
+    locations = pd.Series(locations, dtype=object)
+    matches = [_segments(location) for location in locations]
+    counts = np.fromiter(map(len, matches), dtype=np.int64, count=len(matches))
+    groups = np.array(list(chain.from_iterable(matches)), dtype=str).reshape(-1, 4)
+    starts = groups[:, 1].astype(np.int64)
+    ends = np.where(groups[:, 3] == "", groups[:, 1], groups[:, 3]).astype(np.int64)
+
+    # the first and the last segment of each feature with at least one segment
+    located = counts > 0
+    last = np.cumsum(counts)[located] - 1
+    first = last - counts[located] + 1
+    index = locations.index[located]
+    segments = pd.DataFrame({"feature": np.repeat(locations.index.values, counts), "start": starts, "end": ends})
+    features = pd.DataFrame({"start": starts[first], "end": ends[last],
+                             "strand": np.where(locations[located].str.contains("complement", regex=False), "-", "+"),
+                             "partial_start": groups[first, 0] == "<", "partial_end": groups[last, 2] == ">",
+                             "segments": counts[located]}, index=index)
+    return features, segments
+
+
+def _segments(location):
+    """
+    the segments of one location as tuples (<, start, >, end) of strings
+    """
+    if not isinstance(location, str):
+        return []
+    simple = SIMPLE_PATTERN.match(location)
+    if simple:
+        return [simple.groups()]
+    segments = SEGMENT_PATTERN.findall(location)
+    return segments[::-1] if location.startswith(COMPLEMENT_JOINS) else segments
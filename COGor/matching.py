@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# the minimal overlap of two features (fraction of the longer one) to be considered the same feature
+DEFAULT_MIN_OVERLAP = 0.8
+
+
+def match_features(tables, min_overlap=DEFAULT_MIN_OVERLAP):
+    """
+    Pair the features predicted by several tools. Features are compared only within the same contig and strand,
+    features with the same start are always paired, other features are paired if they overlap at least by min_overlap
+    of the longer feature. Each feature is paired at most with one feature of every other tool.
+    :param tables: list of DataFrames with columns seqname, start, end and strand (e.g. eggNOG-mapper, Operon-mapper
+    and Batch CD-Search processed tables)
+    :param min_overlap: the minimal overlap of two features as a fraction of the longer feature
+    :return: DataFrame with one row per feature sorted by contig and start, with the columns seqname, strand, start,
+    end (coordinates of the first tool that predicted the feature), 0, 1, 2, ... (position of the feature in each
+    table, -1 if the tool did not predict it) and match ('exact' if all tools that predicted the feature agree
+    on start, 'fuzzy' if they differ in start, 'unmatched' if only one tool predicted the feature)
+    """
+    columns = ["seqname", "strand", "start", "end"]
+    matched = _locations(tables[0], columns)
+    matched[0] = np.arange(len(tables[0]))
+    exact = np.ones(len(matched), dtype=bool)
+
+    for number, table in enumerate(tables[1:], start=1):
+        other = _locations(table, columns)
+        pairs = _pair_features(matched, other, min_overlap)
+
+        # paired features get the position in the other table, unpaired features of the other table are added
+        matched[number] = -1
+        matched.loc[pairs["left"].values, number] = pairs["right"].values
+        exact[pairs["left"].values] &= pairs["exact"].values
+
+        unpaired = np.setdiff1d(np.arange(len(other)), pairs["right"].values)
+        added = other.iloc[unpaired].copy()
+        for index in range(number):
+            added[index] = -1
+        added[number] = unpaired
+        matched = pd.concat([matched, added], ignore_index=True)
+        exact = np.concatenate([exact, np.ones(len(unpaired), dtype=bool)])
+
+    found = (matched[list(range(len(tables)))] >= 0).sum(axis=1)
+    matched["match"] = np.where(found == 1, "unmatched", np.where(exact, "exact", "fuzzy"))
+    return matched.sort_values(["seqname", "start"], kind="stable").reset_index(drop=True)
+
+
+def match_summary(matched):
+    """
+    Count the features matched exactly, fuzzily or not at all
+    :param matched: the result of match_features
+    :return: dictionary with the counts
+    """
+    counts = matched["match"].value_counts()
+    return {match: int(counts.get(match, 0)) for match in ("exact", "fuzzy", "unmatched")}
+
+
+def _locations(table, columns):
+    """
+    get the locations of features as DataFrame with positional index
+    """
+    locations = table[columns].reset_index(drop=True)
+    locations["seqname"] = locations["seqname"].astype(str)
+    locations[["start", "end"]] = locations[["start", "end"]].astype(np.int64)
+    return locations
+
+
+def _pair_features(left, right, min_overlap):
+    """
+    find one-to-one pairs of overlapping features of two tables, candidates are found by binary search
+    in the features sorted by start, pairs with the same start are preferred and then pairs with higher overlap
+    :return: DataFrame with columns left, right (positions in the tables) and exact (the same start)
+    """
+    candidates = []
+    right_groups = right.groupby(["seqname", "strand"], sort=False).indices
+    for key, left_positions in left.groupby(["seqname", "strand"], sort=False).indices.items():
+        right_positions = right_groups.get(key)
+        if right_positions is None:
+            continue
+        right_positions = right_positions[np.argsort(right["start"].values[right_positions], kind="stable")]
+        right_start = right["start"].values[right_positions]
+        right_end = right["end"].values[right_positions]
+        left_start = left["start"].values[left_positions]
+        left_end = left["end"].values[left_positions]
+
+        # all features of the right table that start in the window [left start - the longest feature, left end]
+        longest = int((right_end - right_start).max())
+        low = np.searchsorted(right_start, left_start - longest, side="left")
+        high = np.searchsorted(right_start, left_end, side="right")
+        counts = high - low
+        left_index = np.repeat(np.arange(len(left_positions)), counts)
+        right_index = np.repeat(low, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        overlap = np.minimum(left_end[left_index], right_end[right_index]) - \
+            np.maximum(left_start[left_index], right_start[right_index]) + 1
+        longer = np.maximum(left_end[left_index] - left_start[left_index],
+                            right_end[right_index] - right_start[right_index]) + 1
+        exact = left_start[left_index] == right_start[right_index]
+        keep = exact | ((overlap > 0) & (overlap >= min_overlap * longer))
+        candidates.append(pd.DataFrame({"left": left_positions[left_index[keep]],
+                                        "right": right_positions[right_index[keep]],
+                                        "exact": exact[keep], "overlap": overlap[keep] / longer[keep]}))
+
+    if not candidates:
+        return pd.DataFrame({"left": np.array([], dtype=int), "right": np.array([], dtype=int),
+                             "exact": np.array([], dtype=bool)})
+
+    # greedy one-to-one pairing: the same start first, then the highest overlap
+    candidates = pd.concat(candidates, ignore_index=True).sort_values(["exact", "overlap"], ascending=False,
+                                                                       kind="stable")
+    used_left, used_right, pairs = set(), set(), []
+    for left_position, right_position, exact in zip(candidates["left"], candidates["right"], candidates["exact"]):
+        if left_position not in used_left and right_position not in used_right:
+            used_left.add(left_position)
+            used_right.add(right_position)
+            pairs.append((left_position, right_position, exact))
+    return pd.DataFrame(pairs, columns=["left", "right", "exact"]).astype({"left": int, "right": int, "exact": bool})
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+import os
+import pandas as pd
+from COGor.program_processor import em_table, om_table, batch_table, write_gff
+from COGor.consensus import consensus_table
+from COGor.writer import write_plot_file, write_contig_plot_files
+from COGor.matching import DEFAULT_MIN_OVERLAP
+from COGor.cohort import add_genome
+
+
+@dataclass
+class PipelineResult:
+    """
+    Tables created by the whole process for one genome, all of them are DataFrames with gff columns
+    """
+    em: pd.DataFrame
+    om: pd.DataFrame
+    batch: pd.DataFrame
+    consensus: pd.DataFrame
+
+
+def run_pipeline(em_file, cds_file, orf_file, cog_file, batch_file, gff_file=None, fasta_file=None, get_pseudo=True,
+                 get_ncrna=True, organism_name=None, output_dir=None, write_intermediate=False, compress=False,
+                 feature_types=(), min_overlap=DEFAULT_MIN_OVERLAP, workers=1, by_contig=False, cohort_dir=None):
+    """
+    Run the whole process for one genome in memory, the processed tables of the tools are passed directly
+    to the consensus. Files are saved only if output_dir is given.
+    :param em_file: the path to eggNOG-mapper output file
+    :param cds_file: the path to eggNOG-mapper input file
+    :param orf_file: the path to Operon-mapper outputs file ORFs_coordinates.txt
+    :param cog_file: the path to Operon-mapper outputs file predicted_COGs.txt
+    :param batch_file: the path to Batch CD-Search outputs file hitdata.txt
+    :param gff_file: the path to gff file where all features are stored (required for get_pseudo and get_ncrna)
+    :param fasta_file: the path to genomic sequence, file_to_plot.txt is saved only if it is given
+    :type get_pseudo: bool
+    :type get_ncrna: bool
+    :param organism_name: the name of the organism used in the names of the processed files (required with
+    write_intermediate or cohort_dir)
+    :param output_dir: the output directory, nothing is saved if None
+    :param write_intermediate: save also the processed files of the tools (em_, om_ and batch_organism_name.gff)
+    :param compress: save gzipped file_to_plot.txt.gz
+    :param feature_types: other feature types from gff_file to be added (e.g. ('tRNA', 'rRNA', 'tmRNA'))
+    :param min_overlap: the minimal overlap of features predicted by different tools to be considered the same feature
+    :param workers: the number of processes, contigs are split into shards processed in parallel if more than 1
+    :param by_contig: save one file per replicon (file_to_plot_<record id>.txt) instead of one file_to_plot.txt
+    :param cohort_dir: the cohort store directory, the consensus is added to the store as organism_name
+    (see cohort.add_genome)
+    :return: PipelineResult with the processed tables and the consensus
+    """
+    if organism_name is None and ((output_dir is not None and write_intermediate) or cohort_dir is not None):
+        raise ValueError("organism_name is required to save the processed files or to add the genome to the cohort "
+                         "store")
+    if gff_file is None:
+        get_pseudo, get_ncrna, feature_types = False, False, ()
+
+    result = PipelineResult(em_table(em_file, cds_file), om_table(orf_file, cog_file), batch_table(batch_file), None)
+    result.consensus = consensus_table(result.em, result.om, result.batch, get_pseudo, get_ncrna, gff_file,
+                                        feature_types, min_overlap, workers)
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        if write_intermediate:
+            for tool in ("em", "om", "batch"):
+                write_gff(getattr(result, tool), output_dir + "/" + tool + "_" + organism_name + ".gff")
+        if fasta_file is not None and by_contig:
+            write_contig_plot_files(result.consensus, fasta_file, output_dir, compress)
+        elif fasta_file is not None:
+            write_plot_file(result.consensus, fasta_file,
+                            output_dir + "/file_to_plot.txt" + (".gz" if compress else ""))
+    if cohort_dir is not None:
+        add_genome(cohort_dir, organism_name, result.consensus)
+    return result
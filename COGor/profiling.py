@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from functools import wraps
+import cProfile
+import json
+import os
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak RSS is not measured
+    resource = None
+
+# environment variables with the path to metrics file (NDJSON) and the directory for cProfile dumps, the variables
+# are inherited by the worker processes so all processes of the run write into the same files
+PROFILE_ENV = "COGOR_PROFILE"
+CPROFILE_ENV = "COGOR_CPROFILE"
+
+# stages currently running in this process, the innermost is the last one
+_stages = []
+
+
+def enable(metrics_file=None, cprofile_dir=None):
+    """
+    Enable the instrumentation for this process and all processes started from it
+    :param metrics_file: the path to metrics file, one JSON record per stage is appended (None to keep disabled)
+    :param cprofile_dir: the directory for cProfile dump of each genome (organism_name.prof), None for no dumps
+    """
+    for variable, value in ((PROFILE_ENV, metrics_file), (CPROFILE_ENV, cprofile_dir)):
+        if value is None:
+            os.environ.pop(variable, None)
+        else:
+            os.environ[variable] = os.path.abspath(value)
+    if cprofile_dir is not None:
+        os.makedirs(cprofile_dir, exist_ok=True)
+
+
+def enabled():
+    """
+    check if the metrics are recorded
+    """
+    return bool(os.environ.get(PROFILE_ENV))
+
+
+@contextmanager
+def stage(name, genome=None):
+    """
+    Measure the stage of the pipeline: wall time, peak RSS of the process and counters added by count().
+    The record is appended to the metrics file when the stage ends, also if it fails (with the exception details).
+    Stages can be nested, the genome is inherited from the outer stage.
+    :param name: the name of the stage
+    :param genome: the name of the organism
+    """
+    if not enabled():
+        yield
+        return
+
+    record = {"stage": name, "genome": genome if genome is not None else (_stages[-1]["genome"] if _stages else None),
+              "parent": _stages[-1]["stage"] if _stages else None, "pid": os.getpid(), "counters": {}}
+    _stages.append(record)
+    start = time.perf_counter()
+    try:
+        yield
+        record["status"] = "ok"
+    except BaseException as error:
+        record["status"] = "error"
+        record["error"] = type(error).__name__ + ": " + str(error)
+        record["traceback"] = traceback.format_exc()
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["peak_rss_mb"] = peak_rss_mb()
+        _stages.pop()
+        _write(record)
+
+
+def profiled(name):
+    """
+    Decorator measuring every call of the function as a stage, see stage
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(**counters):
+    """
+    Add the counters (e.g. the number of rows) to the innermost running stage, counters with the same name are summed
+    """
+    if _stages:
+        for key, value in counters.items():
+            _stages[-1]["counters"][key] = _stages[-1]["counters"].get(key, 0) + int(value)
+
+
+def record(name, genome=None, **values):
+    """
+    Append a single record that is not a measured stage (e.g. the latency of a job of the watch service)
+    :param name: the name of the record (saved as stage)
+    :param genome: the name of the organism
+    :param values: other values of the record
+    """
+    if enabled():
+        _write(dict({"stage": name, "genome": genome, "pid": os.getpid()}, **values))
+
+
+@contextmanager
+def genome_profile(organism_name):
+    """
+    Run cProfile during the processing of the genome and save the statistics into organism_name.prof
+    in the cProfile directory, nothing is done if cProfile is not enabled
+    """
+    cprofile_dir = os.environ.get(CPROFILE_ENV)
+    if not cprofile_dir:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(os.path.join(cprofile_dir, organism_name + ".prof"))
+
+
+def peak_rss_mb():
+    """
+    the peak resident set size of this process in MB, None if it cannot be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def read_metrics(metrics_file):
+    """
+    Read the records of the metrics file
+    :return: list of dictionaries
+    """
+    with open(metrics_file, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _write(record):
+    """
+    append the record as one line, each line is written by a single write so the records of parallel processes
+    are not mixed
+    """
+    line = (json.dumps(record, default=str) + "\n").encode()
+    file = os.open(os.environ[PROFILE_ENV], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(file, line)
+    finally:
+        os.close(file)
@@ -1,8 +1,21 @@
-from re import search, split
+from itertools import islice
+import re
 import pandas as pd
-from Bio import SeqIO
 import os
-import pkg_resources
+from COGor.cog_index import get_categories, canonical_cog
+from COGor.readers import iter_hitdata, iter_query_lines, iter_fasta_records, iter_fasta_headers, read_gff
+from COGor.locations import header_locations, parse_locations
+from COGor.profiling import profiled, count
+
+GFF_COLUMNS = ["seqname", "source", "type", "start", "end", "score", "strand", "frame", "attribute"]
+# information about features carried as columns of the processed tables, rendered into attribute column only on output
+ATTRIBUTE_COLUMNS = ["ID", "COG", "CAT", "name", "desc"]
+# the attribute columns kept as categorical
+CATEGORICAL_COLUMNS = ("COG", "CAT")
+# the value of the attribute (see _attribute_value)
+VALUE_PATTERN = re.compile(r"[^=,;]*")
+# the maximal number of sequences in one Batch CD-Search submission
+BATCH_LIMIT = 4000
 
 
 def em_processor(organism_name, em_file, cds_file, output_dir=os.getcwd()):
@@ -16,215 +29,307 @@ def em_processor(organism_name, em_file, cds_file, output_dir=os.getcwd()):
     :param output_dir: the output directory
     :return: processed file
     """
-    em_data = pd.read_csv(em_file, sep="\t", header=None, comment="#", names=("seqname", "source", "type", "start",
-                                                                              "end", "score", "strand", "frame",
-                                                                              "attribute"))
-    cds_data = SeqIO.parse(cds_file, "fasta")
-    # get only header of each CDS
-    desc = [record.description for record in cds_data]
-    # iterate through CDSs header
-    cogs_file = pkg_resources.resource_filename(__name__, 'COGor-data/cogs.txt')
-    cat_data = (open(cogs_file, "r")).readlines()
-
-    for record in desc:
-        seq_id = record[0:record.index(" [")]
-        # include all possible locations forward/reverse strand and join
-        dic = {'pattern': "complement\((.*?)\)", 'strand': "-"} if "complement" in record else \
-            {'pattern': "location=(.*?)]", 'strand': "+"}
-        location = search(dic['pattern'], record).group(1)
-
-        if "<" in location:
-            location = location[1:]
-
-        if "join" in location:
-            location = location[:-1] if location[-1] == ")" else location
-            location = (location[5:].split(".."))
-            location = [location[0], location[len(location) - 1]]
-        else:
-            location = location.split("..")
-
-        if ">" in location[1]:
-            location[1] = location[1][1:]
-
-        # add the information about location to the corresponding row of eggnog-mappers outputs
-        em_data.loc[em_data.seqname == seq_id, ["seqname", "strand", "start", "end"]] = \
-            [seq_id[seq_id.index("|") + 1:seq_id.index("_prot")], dic['strand'], location[0], location[1]]
-
-    for row in em_data.index:
-        # get only useful information about each CDS: feature_id, name, COG, COG category
-        attribute = split(r"[=,;]", em_data["attribute"][row])
-        seq_id = attribute[attribute.index("ID") + 1]
-        dic = {'COG': (attribute[attribute.index("em_OGs") + 1].split("@"))[0],
-               'desc': attribute[attribute.index("em_desc") + 1],
-               'cat': attribute[attribute.index("em_COG_cat") + 1]}
-        # if cog is from COG database
-        try:
-            index = [i for i, s in enumerate(cat_data) if dic["COG"] in s][0]
-            dic["cat"] = cat_data[index][8]
-        # else - it is from eggNOG or ROG
-        except IndexError:
-            dic["cat"] = dic["cat"][0]
-        try:
-            dic['name'] = attribute[attribute.index("em_Preferred_name") + 1]
-        except ValueError:
-            dic['name'] = '-'
-
-        dic['cat'] = 'S' if dic['cat'] == 'None' else dic['cat']
-        em_data.loc[row, "attribute"] = "".join(["ID=", seq_id, ";COG=", dic['COG'], ";CAT=", dic['cat'],
-                                                 ";name=", dic['name'], ";desc=", dic['desc']])
-
-    return em_data.to_csv(output_dir + '/em_' + organism_name + '.gff', sep='\t', index=False)
+    return write_gff(em_table(em_file, cds_file), output_dir + '/em_' + organism_name + '.gff')
 
 
-def om_processor(organism_name, orf_file, cog_file, output_dir=os.getcwd()):
+@profiled("em_table")
+def em_table(em_file, cds_file):
     """
-    Process the outputs files (ORF_coordinates.txt and predicted_COGs.txt) from Operon-mapper into more structured COGor-data.
-    The outputs of this function is file in gff format that contains a suitable header with information about all
-    predicted features
-    :type organism_name: str
-    :param orf_file: the path to Operon-mapper outputs file ORFs_coordinates.txt
-    :param cog_file: the path to Operon-mapper outputs file predicted_COGs.txt
-    :param output_dir: the output directory
-    :return: processed file
+    Process the output file (decorated.gff) from eggNOG-mapper tool in memory, see em_processor
+    :param em_file: the path to eggNOG-mapper output file
+    :param cds_file: the path to eggNOG-mapper input file
+    :return: DataFrame with gff columns, the attribute is split into columns ID, COG, CAT, name and desc
     """
-    orf_data = pd.read_csv(orf_file, sep="\t", header=None, comment="#", names=("seqname", "source", "type", "start",
-                                                                                "end", "score", "strand", "frame",
-                                                                                "attribute"))
-    cog_data = pd.read_csv(cog_file, sep="\t", header=None, comment="#", names=("ID", "COG", "category"))
-    cogs_file = pkg_resources.resource_filename(__name__, 'COGor-data/cogs.txt')
-    cat_data = (open(cogs_file, "r")).readlines()
-
-    for row in orf_data.index:
-        # iterate through all features in ORF file and save the relevant information from the COG file
-        attribute = split(r"[=,;]", orf_data["attribute"][row])
-        feature_id = attribute[attribute.index("ID") + 1]
-        try:
-            cog = cog_data.loc[cog_data["ID"] == feature_id, "COG"].values[0]
+    em_data = read_gff(em_file)
+    # get only header of each CDS (the sequences are not read) and parse the locations of all CDSs at once
+    locations = _cds_locations(list(iter_fasta_headers(cds_file)))
+    count(cds_headers=len(locations))
+    locations = locations.drop_duplicates("seq_id", keep="last").set_index("seq_id")
+
+    # add the information about location to the corresponding rows of eggnog-mappers outputs (join by sequence id)
+    located = em_data["seqname"].isin(locations.index)
+    located_locations = locations.loc[em_data.loc[located, "seqname"]]
+    for column in ["seqname", "strand", "start", "end"]:
+        em_data.loc[located, column] = located_locations[column].values
+
+    # get only useful information about each CDS: feature_id, name, COG, COG category
+    attribute = em_data["attribute"]
+    cog = _attribute_values(attribute, "em_OGs").str.split("@").str[0]
+    name = _attribute_values(attribute, "em_Preferred_name").fillna("-")
+
+    # if cog is from COG database use its category, else - it is from eggNOG or ROG
+    cat = pd.Series(get_categories(cog), index=em_data.index, dtype=object)
+    cat = cat.fillna(_attribute_values(attribute, "em_COG_cat").str[0])
+
+    em_data["ID"] = _attribute_values(attribute, "ID")
+    em_data["COG"] = cog.astype("category")
+    em_data["CAT"] = cat.astype("category")
+    em_data["name"] = name
+    em_data["desc"] = _attribute_values(attribute, "em_desc")
+    count(features=len(em_data), located=located.sum(), cog_hits=cog.str.startswith("COG", na=False).sum())
+    return em_data.drop(columns="attribute")
+
+
+def _cds_locations(headers):
+    """
+    parse the locations of CDSs from the headers of CDS file (e.g. [location=complement(<1..200)])
+    :param headers: list of CDS headers
+    :return: DataFrame with the columns seq_id, seqname, strand, start, end, partial_start, partial_end and segments
+    (see locations.parse_locations), CDSs without location are skipped
+    """
+    headers = pd.Series(headers, dtype=object)
+    features, segments = parse_locations(header_locations(headers))
+    seq_ids = headers.loc[features.index].str.partition(" [")[0]
+    return features.assign(seq_id=seq_ids, seqname=contig_names(seq_ids))[["seq_id", "seqname", "strand", "start",
+                                                                            "end", "partial_start", "partial_end",
+                                                                            "segments"]]
 
-            # if cog is from COG database
-            try:
-                index = [i for i, s in enumerate(cat_data) if cog in s][0]
-                CAT = cat_data[index][8]
 
-            # else - it is from eggNOG or ROG
-            except IndexError:
-                CAT = (cog_data.loc[cog_data["ID"] == feature_id, "category"].values[0])[1][0]
+def contig_names(seq_ids):
+    """
+    Get the contig (replicon) accessions from the ids of CDSs, e.g. lcl|NZ_ABCD01000002.1_prot_WP_1234.1_5 ->
+    NZ_ABCD01000002.1, ids in other format are used as they are (without the lcl| prefix)
+    :param seq_ids: Series with the ids of CDSs
+    :return: Series with contig accessions
+    """
+    ids = seq_ids.str.replace(r"^[^|\s]*\|", "", regex=True)
+    return ids.str.extract(r"^(.+?)_(?:prot|cds)_", expand=False).fillna(ids)
 
-            dic = {'cat': 'S', 'desc': '-'} if "ROG" in cog else \
-                {'cat': CAT,'desc': cog_data.loc[cog_data["ID"] == feature_id, "category"].values[0].split("] ")[1]}
 
-            orf_data.loc[row, "attribute"] = "".join(
-                ["ID=", feature_id, ";COG=", cog, ";CAT=", dic['cat'], ";desc=", dic['desc']])
+def _attribute_values(attribute, key):
+    """
+    get the value of the key from each attribute string of gff file, NaN if the key is missing
+    """
+    return pd.Series([_attribute_value(text, key) if isinstance(text, str) else None for text in attribute],
+                     index=attribute.index, dtype=object)
 
-        except:
-            orf_data.loc[row, "attribute"] = "".join(["ID=", feature_id, ";COG=", "-", ";CAT=", "-"])
 
-    return orf_data.to_csv(output_dir + '/om_' + organism_name + '.gff', sep='\t', index=False)
+def _attribute_value(text, key):
+    """
+    find the key preceded by the beginning, '=', ',' or ';' and followed by '=', ',' or ';', the value ends before
+    the next '=', ',' or ';' (the same as the pattern (?:^|[=,;])key[=,;]([^=,;]*), but faster)
+    """
+    position = text.find(key)
+    while position != -1:
+        end = position + len(key)
+        if (position == 0 or text[position - 1] in "=,;") and text[end:end + 1] in ("=", ",", ";"):
+            return VALUE_PATTERN.match(text, end + 1).group(0)
+        position = text.find(key, position + 1)
+    return None
 
 
-def batch_splitter(organism_name, gene_file,output_dir=os.getcwd()):
+def om_processor(organism_name, orf_file, cog_file, output_dir=os.getcwd()):
     """
+    Process the outputs files (ORF_coordinates.txt and predicted_COGs.txt) from Operon-mapper into more structured COGor-data.
+    The outputs of this function is file in gff format that contains a suitable header with information about all
+    predicted features
     :type organism_name: str
-    :param gene_file: the path to file to be split
+    :param orf_file: the path to Operon-mapper outputs file ORFs_coordinates.txt
+    :param cog_file: the path to Operon-mapper outputs file predicted_COGs.txt
     :param output_dir: the output directory
-    :return: two split files
+    :return: processed file
     """
-    records = list(SeqIO.parse(gene_file, "fasta"))
-    if len(records) > 4000:
-        SeqIO.write(records[0:3500], organism_name + "_genes1.fasta", "fasta")
-        SeqIO.write(records[3500:len(records)], output_dir + organism_name + "_genes2.fasta", "fasta")
-    else:
-        print("The file does not need to be split because it does not contain more than 4000 sequences.")
+    return write_gff(om_table(orf_file, cog_file), output_dir + '/om_' + organism_name + '.gff')
 
 
-def batch_merger(organism_name, file1, file2,output_dir=os.getcwd()):
+@profiled("om_table")
+def om_table(orf_file, cog_file):
+    """
+    Process the outputs files (ORF_coordinates.txt and predicted_COGs.txt) from Operon-mapper in memory,
+    see om_processor
+    :param orf_file: the path to Operon-mapper outputs file ORFs_coordinates.txt
+    :param cog_file: the path to Operon-mapper outputs file predicted_COGs.txt
+    :return: DataFrame with gff columns, the attribute is split into columns ID, COG, CAT and desc
     """
+    orf_data = read_gff(orf_file)
+    cog_data = pd.read_csv(cog_file, sep="\t", header=None, comment="#", names=("ID", "COG", "category"),
+                           dtype=object)
+    # the same contig names as in the CDS file
+    orf_data["seqname"] = orf_data["seqname"].astype(str).str.replace(r"^lcl\|", "", regex=True)
+
+    # join all features in ORF file with the relevant information from the COG file (the first COG of each feature)
+    orf_data["ID"] = _attribute_values(orf_data["attribute"], "ID")
+    cog_data = cog_data.dropna(subset=["ID", "COG"]).drop_duplicates("ID")
+    features = orf_data[["ID"]].merge(cog_data, on="ID", how="left").set_index(orf_data.index)
+    assigned = features["COG"].notna()
+    rog = features["COG"].str.contains("ROG", na=False)
+
+    # if cog is from COG database use its category, else - it is from eggNOG or ROG (category is in format [C] desc)
+    category = features["category"]
+    cat = pd.Series(get_categories(features["COG"]), index=orf_data.index, dtype=object)
+    cat = cat.fillna(category.str[1]).fillna("-")
+    desc = category.str.split("] ").str[1].fillna("-")
+
+    # ROG -> unknown function, no COG assigned -> no category and description
+    cat[rog], desc[rog] = "S", "-"
+    cat[~assigned], desc[~assigned] = "-", None
+
+    orf_data["COG"] = features["COG"].fillna("-").astype("category")
+    orf_data["CAT"] = cat.astype("category")
+    orf_data["desc"] = desc
+    count(features=len(orf_data), cog_lines=len(cog_data), cog_hits=assigned.sum())
+    return orf_data.drop(columns="attribute")
+
+
+def batch_splitter(organism_name, gene_file, output_dir=os.getcwd(), max_sequences=BATCH_LIMIT):
+    """
+    Split the file with sequences into files with at most max_sequences sequences that can be submitted
+    to Batch CD-Search. The sequences are streamed, only one sequence is kept in memory.
     :type organism_name: str
-    :param file1: the first annotated file from Batch-CD Search
-    :param file2: the second annotated file from Batch-CD Search
+    :param gene_file: the path to file to be split (may be gzipped)
     :param output_dir: the output directory
-    :return: a merged file
+    :param max_sequences: the maximal number of sequences in one file (one submission)
+    :return: list of the paths to split files organism_name_genes1.fasta, organism_name_genes2.fasta, ...,
+    empty if the file does not need to be split
     """
-    data1, data2 = open(file1).read(), open(file2).read()
-    data1 = data1[data1.index("Q#1"):len(data1)]
-    data2 = data2[data2.index("Q#1"):len(data2)]
-    data1 += data2
-
-    with open(output_dir + organism_name + "_merged_hitdata.txt", "w") as file:
-        file.write(data1)
-        file.close()
-
-
-def batch_processor(organism_name, batch_file, output_dir=os.getcwd()):
+    files, output, number = [], None, 0
+    try:
+        for record_id, record in iter_fasta_records(gene_file):
+            if number % max_sequences == 0:
+                if output is not None:
+                    output.close()
+                files.append(os.path.join(output_dir, organism_name + "_genes" + str(len(files) + 1) + ".fasta"))
+                output = open(files[-1], "wb")
+            output.writelines(record)
+            number += 1
+    finally:
+        if output is not None:
+            output.close()
+
+    if len(files) < 2:
+        for file in files:
+            os.remove(file)
+        print("The file does not need to be split because it does not contain more than " + str(max_sequences) +
+              " sequences.")
+        return []
+    return files
+
+
+def batch_merger(organism_name, *files, output_dir=os.getcwd(), max_sequences=None):
+    """
+    Merge the outputs files (hitdata.txt) of several Batch CD-Search submissions into one file that can be processed
+    by batch_processor. Queries are renumbered so that they are unique: the queries of each file follow the last
+    query of the previous file. Only the query lines are kept, the files are streamed.
+    :type organism_name: str
+    :param files: the paths to annotated files from Batch-CD Search in the order of submissions (may be gzipped)
+    :param output_dir: the output directory (keyword-only, batch_merger(organism_name, file1, file2, output_dir=...))
+    :param max_sequences: the number of sequences in each submission (see batch_splitter), the queries of each file
+    are then shifted by this number, otherwise by the last query found in the previous file (queries without hits
+    at the end of the file are not in hitdata.txt)
+    :return: the path to merged file organism_name_merged_hitdata.txt
+    """
+    directories = [batch_file for batch_file in files if os.path.isdir(batch_file)]
+    if directories:
+        # the output directory was the fourth positional argument before any number of files could be merged
+        raise TypeError("batch_merger got a directory instead of hitdata file: " + directories[0] +
+                        ", the output directory is given as output_dir=...")
+
+    merged_file = output_dir + "/" + organism_name + "_merged_hitdata.txt"
+    offset = 0
+    with open(merged_file, "w") as file:
+        for batch_file in files:
+            last = 0
+            for line in iter_query_lines(batch_file):
+                query, rest = line[2:].split(" ", 1)
+                last = max(last, int(query))
+                file.write("Q#" + str(int(query) + offset) + " " + rest)
+            offset += last if max_sequences is None else max_sequences
+    return merged_file
+
+
+@profiled("batch_processor")
+def batch_processor(organism_name, batch_file, output_dir=os.getcwd(), chunk_size=10000):
     """
     Process the outputs file (hitdata.txt) from Batch CD-Search tool into more structured COGor-data.
     The outputs of this function is file in gff format that contains a suitable header with information about CDSs with
     assigned COG by Batch CD-Search
     :type organism_name: str
-    :param batch_file: the path to Batch CD-Search outputs file hitdata.txt
+    :param batch_file: the path to Batch CD-Search outputs file hitdata.txt (may be gzipped, '-' for standard input)
     :param output_dir: the output file
+    :param chunk_size: the number of queries processed at once
     :return: processed file
     """
+    with open(output_dir + '/batch_' + organism_name + '.gff', "w") as file:
+        file.write("\t".join(GFF_COLUMNS) + "\n")
+        # stream the first specific hit of each query, process them in chunks and write them to the output file
+        for chunk in _batch_chunks(batch_file, chunk_size):
+            write_gff(chunk, file, header=False)
 
-    # create new DataFrame to store the necessary information
-    batch_gff = pd.DataFrame(
-        columns=["seqname", "source", "type", "start", "end", "score", "strand", "frame", "attribute"])
-    batch_data = (open(batch_file).read())
-    batch_data = (batch_data[batch_data.index("Q#"):len(batch_data) - 1]).split('\n')
-    query = ''
-    cogs_file = pkg_resources.resource_filename(__name__, 'COGor-data/cogs.txt')
-    cogs_data = (open(cogs_file, "r")).readlines()
-
-    # iterate through queries
-    for row in batch_data:
-        new_query = search('Q#\d+', row).group(0)
-
-        # if COG is not assigned or new_line is duplicate, continue to next iteration
-        if not ('\tspecific\t' in row) or query == new_query:
-            continue
-
-        query = new_query
-        seq_id = row[row.index("|") + 1:row.index("_prot")]
-        id = row[row.index("|") + 1:row.index(" [")]
-        id = "".join(["ID=", id])
-
-        # include all possible locations forward/reverse strand and join
-        dic = {'pattern': "complement\((.*?)\)", 'strand': '-'} if 'complement' in row else \
-            {'pattern': "location=(.*?)]", 'strand': '+'}
-        location = search(dic['pattern'], row).group(1)
-
-        if "<" in location:
-            location = location[1:]
 
-        if "join" in location:
-            location = location[:-1] if location[-1] == ")" else location
-            location = (location[5:].split(".."))
-            location = [location[0], location[len(location) - 1]]
-
-        else:
-            location = location.split("..")
-            location = [location[0], location[1]]
-
-        if ">" in location[1]:
-            location[1] = location[1][1:]
-
-        try:
-            COG = "".join(["COG=", search("(COG\d+)", row).group(1)])
+@profiled("batch_table")
+def batch_table(batch_file, chunk_size=10000):
+    """
+    Process the outputs file (hitdata.txt) from Batch CD-Search tool in memory, see batch_processor
+    :param batch_file: the path to Batch CD-Search outputs file hitdata.txt (may be gzipped, '-' for standard input)
+    :param chunk_size: the number of queries processed at once
+    :return: DataFrame with gff columns, the attribute is split into columns ID, COG and CAT
+    """
+    chunks = list(_batch_chunks(batch_file, chunk_size))
+    data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=GFF_COLUMNS[:-1] + ["ID", "COG",
+                                                                                                          "CAT"])
+    data[["COG", "CAT"]] = data[["COG", "CAT"]].astype("category")
+    return data
 
-        except AttributeError:
-            COG = "".join(["COG=", "-"])
 
+def _batch_chunks(batch_file, chunk_size):
+    """
+    yield the processed Batch CD-Search hits as DataFrames with gff columns, each with at most chunk_size rows
+    """
+    hits = iter_hitdata(batch_file)
+    chunk = list(islice(hits, chunk_size))
+    while chunk:
+        locations = _cds_locations([header for query, header, cog in chunk])
         # update in COG 2021
-        if COG == "COG=COG3512":
-            COG = "COG=COG1343"
+        cogs = [canonical_cog(chunk[i][2]) for i in locations.index]
+        count(queries=len(chunk), cds_headers=len(locations), cog_hits=sum(cog != "-" for cog in cogs))
+        yield pd.DataFrame({"seqname": locations["seqname"].values, "source": "unknown", "type": "CDS",
+                            "start": locations["start"].values, "end": locations["end"].values, "score": ".",
+                            "strand": locations["strand"].values, "frame": "0",
+                            "ID": locations["seq_id"].str.replace(r"^[^|\s]*\|", "", regex=True).values, "COG": cogs,
+                            "CAT": get_categories(cogs, default="-")})
+        chunk = list(islice(hits, chunk_size))
 
-        index = [i for i, s in enumerate(cogs_data) if COG[4:] in s][0]
-        CAT = cogs_data[index][8]
-        CAT = "".join(["CAT=", CAT])
 
-        attribute = id + ";" + COG + ";" + CAT
-        new_row = pd.DataFrame({"seqname": [seq_id], "source": ["unknown"], "type": ["CDS"], "start": [location[0]], "end": [location[1]],
-                   "score": ["."], "strand": [dic["strand"]], "frame": ["0"], "attribute": [attribute]})
+def write_gff(data, file, header=True):
+    """
+    Save the processed table of the tool into file in gff format, the attribute column is rendered from the columns
+    ID, COG, CAT, name and desc
+    :param data: DataFrame with gff columns
+    :param file: the path to output file or file object
+    :param header: write the names of columns
+    """
+    data.assign(attribute=render_attributes(data))[GFF_COLUMNS].to_csv(file, sep='\t', index=False, header=header)
 
-        batch_gff = pd.concat([batch_gff,new_row], ignore_index=True)
-    return batch_gff.to_csv(output_dir + '/batch_' + organism_name + '.gff', sep='\t', index=False)
+
+def render_attributes(data):
+    """
+    Render the attribute strings (e.g. ID=...;COG=...;CAT=...) from the columns ID, COG, CAT, name and desc,
+    missing values are skipped. Rows with the value in attribute column (features from other sources) are kept as is.
+    :param data: DataFrame with some of the columns ID, COG, CAT, name, desc and attribute
+    :return: Series with attribute strings
+    """
+    attribute = pd.Series("", index=data.index, dtype=object)
+    for key in ATTRIBUTE_COLUMNS:
+        if key in data:
+            value = data[key].astype(object)
+            attribute = attribute + (";" + key + "=" + value.fillna("").astype(str)).where(value.notna(), "")
+    attribute = attribute.str[1:]
+    if "attribute" in data:
+        attribute = data["attribute"].astype(object).where(data["attribute"].notna(), attribute)
+    return attribute
+
+
+def parse_attributes(data):
+    """
+    Split the attribute strings of processed file into columns ID, COG, CAT, name and desc (inverse of
+    render_attributes), COG and CAT are categorical. All the columns are created, with NaN if the key is missing
+    (e.g. an empty table)
+    :param data: DataFrame with gff columns
+    :return: DataFrame with attribute column replaced by the columns
+    """
+    data = data.copy()
+    attribute = data["attribute"].astype(object)
+    for key in ATTRIBUTE_COLUMNS:
+        value = attribute.str.extract("(?:^|;)" + key + "=([^;]*)", expand=False).astype(object)
+        data[key] = value.astype("category") if key in CATEGORICAL_COLUMNS else value
+    return data.drop(columns="attribute")
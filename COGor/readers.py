@@ -0,0 +1,158 @@
+from contextlib import nullcontext
+import gzip
+import mmap
+import os
+import re
+import sys
+import pandas as pd
+
+QUERY_PATTERN = re.compile(r"^(Q#\d+) - >?(.*)$")
+COG_PATTERN = re.compile(r"COG\d+")
+
+
+def open_text(file):
+    """
+    Open the text file for reading, gzip compressed files (.gz) are decompressed on the fly
+    :param file: the path to the file, '-' for standard input
+    :return: file object to be used in with statement
+    """
+    if file == "-":
+        return nullcontext(sys.stdin)
+    if str(file).endswith(".gz"):
+        return gzip.open(file, "rt")
+    return open(file, "r")
+
+
+def iter_hitdata(batch_file):
+    """
+    Read the outputs file (hitdata.txt) from Batch CD-Search tool line by line and yield only the first specific hit
+    of each query, the other hits of the same query are skipped
+    :param batch_file: the path to Batch CD-Search outputs file hitdata.txt (may be gzipped, '-' for standard input)
+    :return: generator of tuples (query, CDS header, COG), COG is '-' if the specific hit is not from COG database
+    """
+    query = ''
+    with open_text(batch_file) as hits:
+        for line in hits:
+            if not line.startswith("Q#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            # if COG is not assigned or new_line is duplicate, continue to next line
+            if len(fields) < 8 or fields[1] != "specific":
+                continue
+            new_query, header = QUERY_PATTERN.match(fields[0]).groups()
+            if query == new_query:
+                continue
+
+            query = new_query
+            cog = COG_PATTERN.search(fields[7])
+            yield query, header, cog.group(0) if cog else "-"
+
+
+def iter_query_lines(batch_file):
+    """
+    Yield the query lines (starting with Q#) of Batch CD-Search outputs file, header lines are skipped
+    """
+    with open_text(batch_file) as hits:
+        for line in hits:
+            if line.startswith("Q#"):
+                yield line if line.endswith("\n") else line + "\n"
+
+
+def iter_gff(gff_file, types=None, header=False):
+    """
+    Read the gff file line by line and yield only the features of requested types, comments and the sequence
+    after ##FASTA directive are skipped
+    :param gff_file: the path to gff file (may be gzipped, '-' for standard input)
+    :param types: set of feature types (e.g. {'pseudogene', 'ncRNA'}), all features if None
+    :param header: the first line contains the names of columns (processed files), it is skipped
+    :return: generator of lists with 9 gff fields
+    """
+    with open_text(gff_file) as gff:
+        if header:
+            next(gff, None)
+        for line in gff:
+            if line.startswith("#"):
+                if line.startswith("##FASTA"):
+                    break
+                continue
+            # the type is checked before the whole line is split
+            if types is not None and line.split("\t", 3)[2:3] and line.split("\t", 3)[2] not in types:
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) == 9:
+                yield fields
+
+
+def read_gff(gff_file, types=None, header=False):
+    """
+    Read the features of requested types from the gff file into DataFrame with gff columns, all columns except
+    start and end are kept as strings
+    :param gff_file: the path to gff file (may be gzipped, '-' for standard input)
+    :param types: set of feature types, all features if None
+    :param header: the first line contains the names of columns (processed files), it is skipped
+    :return: DataFrame with gff columns, start and end are integers
+    """
+    data = pd.DataFrame(list(iter_gff(gff_file, types, header)), columns=["seqname", "source", "type", "start", "end",
+                                                                          "score", "strand", "frame", "attribute"])
+    data[["start", "end"]] = data[["start", "end"]].astype(int)
+    return data
+
+
+def iter_fasta_records(fasta_file):
+    """
+    Read the fasta file record by record, only one record is kept in memory
+    :param fasta_file: the path to fasta file (may be gzipped)
+    :return: generator of tuples (record id, list of the record lines as bytes including the header line)
+    """
+    record_id, record = None, []
+    with (gzip.open(fasta_file, "rb") if str(fasta_file).endswith(".gz") else open(fasta_file, "rb")) as fasta:
+        for line in fasta:
+            if line.startswith(b">"):
+                if record_id is not None:
+                    yield record_id, record
+                record_id, record = _fasta_id(line), []
+            if record_id is not None:
+                record.append(line)
+    if record_id is not None:
+        yield record_id, record
+
+
+def iter_fasta_headers(fasta_file):
+    """
+    Read only the headers of the fasta file, the sequences are never decoded or stored. Uncompressed files are
+    memory-mapped and scanned for the header lines, gzipped files are read line by line.
+    :param fasta_file: the path to fasta file (may be gzipped, '-' for standard input)
+    :return: generator of headers without '>' and trailing whitespace (e.g. 'lcl|NC_000913.3_prot_1 [gene=thrL]')
+    """
+    if fasta_file == "-" or str(fasta_file).endswith(".gz") or os.path.getsize(fasta_file) == 0:
+        with open_text(fasta_file) as fasta:
+            for line in fasta:
+                if line.startswith(">"):
+                    yield line[1:].rstrip()
+        return
+
+    with open(fasta_file, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # position of the next '>' at the beginning of a line, None if there is no other header
+        start = 0 if data[:1] == b">" else data.find(b"\n>") + 1 or None
+        while start is not None:
+            end = data.find(b"\n", start)
+            end = len(data) if end == -1 else end
+            yield data[start + 1:end].decode().rstrip()
+            start = data.find(b"\n>", end) + 1 or None
+
+
+def fasta_ids(fasta_file):
+    """
+    Get the ids of the records (the first word of the header) in the fasta file without reading the sequences
+    :param fasta_file: the path to fasta file (may be gzipped)
+    :return: list of record ids
+    """
+    return [_fasta_id(b">" + header.encode()) for header in iter_fasta_headers(fasta_file)]
+
+
+def _fasta_id(header):
+    """
+    the record id from the binary header line
+    """
+    fields = header[1:].split(None, 1)
+    return fields[0].decode() if fields else ""
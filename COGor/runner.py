@@ -0,0 +1,201 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+from COGor.program_processor import em_processor, om_processor, batch_processor
+from COGor.consensus import consensus
+from COGor.matching import DEFAULT_MIN_OVERLAP
+from COGor.track_manager import get_track_template, get_legend, LEGEND_FORMATS
+from COGor.cache import cached_stage, DEFAULT_MAX_SIZE, ASSET_DIR
+from COGor.readers import fasta_ids
+from COGor.writer import contig_plot_file
+from COGor.cohort import add_genome
+from COGor import profiling
+
+# suffixes of the input files of one genome: organism_name + suffix
+INPUT_SUFFIXES = {"eggnog": "_eggnog.gff", "cds": "_cds.txt", "orf_operon": "_orf_operon.txt",
+                  "cog_operon": "_cog_operon.txt", "batch": "_batch.txt", "fasta": ".fasta", "gff": ".gff3"}
+
+
+def genome_files(organism_name, input_dir):
+    """
+    Get the paths to the input files of the genome according to the naming convention
+    :param organism_name: the name of the organism
+    :param input_dir: the input directory
+    :return: dictionary with the paths to input files
+    """
+    return {key: os.path.join(input_dir, organism_name + suffix) for key, suffix in INPUT_SUFFIXES.items()}
+
+
+def discover_genomes(input_dir):
+    """
+    Find all organisms in the input directory that have complete set of input files
+    :param input_dir: the input directory
+    :return: sorted list of organism names
+    """
+    names = [file[:-len(INPUT_SUFFIXES["eggnog"])] for file in os.listdir(input_dir)
+             if file.endswith(INPUT_SUFFIXES["eggnog"])]
+    return sorted(name for name in names
+                  if all(os.path.isfile(path) for path in genome_files(name, input_dir).values()))
+
+
+def read_manifest(manifest_file, input_dir=os.getcwd(), output_dir=os.getcwd()):
+    """
+    Read the manifest file with genomes to be processed, one genome per line: organism_name [input_dir] [output_dir],
+    lines starting with # are skipped
+    :param manifest_file: the path to manifest file
+    :param input_dir: the input directory used if not specified in the manifest
+    :param output_dir: the output directory used if not specified in the manifest, each genome gets its own subdirectory
+    :return: list of tuples (organism_name, input_dir, output_dir)
+    """
+    genomes = []
+    with open(manifest_file, "r") as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            genomes.append((fields[0], fields[1] if len(fields) > 1 else input_dir,
+                            fields[2] if len(fields) > 2 else os.path.join(output_dir, fields[0])))
+    return genomes
+
+
+def run_genome(organism_name, input_dir, output_dir, manager=False, parallel=False, cache_dir=None, force=False,
+               max_cache_size=DEFAULT_MAX_SIZE, compress=False, feature_types=(), workers=1, by_contig=False,
+               cohort_dir=None):
+    """
+    Run the whole process for one genome: program processors, consensus and optionally track manager
+    :param organism_name: the name of the organism
+    :param input_dir: the input directory
+    :param output_dir: the output directory
+    :param manager: create the track template and legend (legend.jpg and legend.svg) for DNAPlotter
+    :param parallel: run the three program processors concurrently in separate processes
+    :param cache_dir: the cache directory, stages with unchanged inputs are not run again (no cache if None)
+    :param force: run all stages even if their outputs are in the cache
+    :param max_cache_size: maximal size of the cache directory in bytes
+    :param compress: save gzipped file_to_plot.txt.gz
+    :param feature_types: other feature types from gff3 file to be added (e.g. ('tRNA', 'rRNA', 'tmRNA'))
+    :param workers: the number of processes used by the consensus, contigs are processed in parallel if more than 1
+    :param by_contig: save one file per replicon (file_to_plot_<record id>.txt) instead of one file_to_plot.txt
+    :param cohort_dir: the cohort store directory, the consensus table is added to the store (see cohort.add_genome)
+    :return: the time of processing in seconds
+    """
+    start = time.perf_counter()
+    with profiling.stage("genome", genome=organism_name), profiling.genome_profile(organism_name):
+        _process_genome(organism_name, input_dir, output_dir, manager, parallel, cache_dir, force, max_cache_size,
+                        compress, feature_types, workers, by_contig, cohort_dir)
+    return time.perf_counter() - start
+
+
+def _process_genome(organism_name, input_dir, output_dir, manager, parallel, cache_dir, force, max_cache_size,
+                    compress, feature_types, workers, by_contig, cohort_dir):
+    """
+    run all stages of the genome, see run_genome
+    """
+    files = genome_files(organism_name, input_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    em_file, om_file, batch_file = [output_dir + "/" + tool + "_" + organism_name + ".gff"
+                                    for tool in ("em", "om", "batch")]
+
+    # Program processor
+    processors = [("em", [files["eggnog"], files["cds"]], [em_file], em_processor,
+                   (organism_name, files["eggnog"], files["cds"], output_dir)),
+                  ("om", [files["orf_operon"], files["cog_operon"]], [om_file], om_processor,
+                   (organism_name, files["orf_operon"], files["cog_operon"], output_dir)),
+                  ("batch", [files["batch"]], [batch_file], batch_processor,
+                   (organism_name, files["batch"], output_dir))]
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(processors)) as pool:
+            for future in [pool.submit(_run_stage, *stage, cache_dir, force, max_cache_size, (), organism_name)
+                           for stage in processors]:
+                future.result()
+    else:
+        for stage in processors:
+            _run_stage(*stage, cache_dir, force, max_cache_size, (), organism_name)
+
+    # Consensus
+    if by_contig:
+        plot_files = [os.path.join(output_dir, contig_plot_file(record_id, compress))
+                      for record_id in fasta_ids(files["fasta"])]
+    else:
+        plot_files = [output_dir + "/file_to_plot.txt" + (".gz" if compress else "")]
+    table_file = output_dir + "/consensus.npz" if cohort_dir is not None else None
+    # all arguments that change the outputs (except the input files) are part of the cache key, workers do not
+    _run_stage("consensus", [em_file, om_file, batch_file, files["fasta"], files["gff"]],
+               plot_files + ([table_file] if table_file else []), consensus,
+               (em_file, om_file, batch_file, files["fasta"], True, True, files["gff"], output_dir, compress,
+                feature_types, DEFAULT_MIN_OVERLAP, workers, by_contig, table_file),
+               cache_dir, force, max_cache_size, (True, True, compress, tuple(feature_types), DEFAULT_MIN_OVERLAP,
+                                                  by_contig, table_file is not None), organism_name)
+    if cohort_dir is not None:
+        add_genome(cohort_dir, organism_name, table_file)
+
+    # Track manager, the files are the same for all genomes and are generated once into the cache
+    if manager:
+        asset_dir = os.path.join(cache_dir, ASSET_DIR) if cache_dir is not None else None
+        get_track_template(output_dir=output_dir, asset_dir=asset_dir)
+        for image_format in LEGEND_FORMATS:
+            get_legend(output_dir=output_dir, asset_dir=asset_dir, image_format=image_format)
+
+
+def _run_stage(stage, inputs, outputs, function, args, cache_dir, force, max_cache_size, params=(), genome=None):
+    """
+    run the stage of the pipeline, through the cache if the cache directory is given
+    """
+    with profiling.stage(stage, genome=genome):
+        if cache_dir is None:
+            function(*args)
+        else:
+            profiling.count(cached=cached_stage(stage, inputs, outputs, function, args, cache_dir, force,
+                                                max_cache_size, params))
+
+
+def run_batch(genomes, jobs=1, manager=False, parallel=False, cache_dir=None, force=False,
+              max_cache_size=DEFAULT_MAX_SIZE, compress=False, feature_types=(), workers=1, by_contig=False,
+              cohort_dir=None):
+    """
+    Run the whole process for many genomes using a pool of processes, failure of one genome does not stop the others
+    :param genomes: list of tuples (organism_name, input_dir, output_dir)
+    :param jobs: the number of genomes processed at the same time
+    :param manager: create the track template and legend (legend.jpg and legend.svg) for DNAPlotter
+    :param parallel: run the three program processors of each genome concurrently
+    :param cache_dir: the cache directory shared by all genomes (no cache if None)
+    :param force: run all stages even if their outputs are in the cache
+    :param max_cache_size: maximal size of the cache directory in bytes
+    :param compress: save gzipped file_to_plot.txt.gz
+    :param feature_types: other feature types from gff3 file to be added
+    :param workers: the number of processes used by the consensus of each genome
+    :param by_contig: save one file per replicon instead of one file_to_plot.txt
+    :param cohort_dir: the cohort store directory shared by all genomes
+    :return: list of tuples (organism_name, time in seconds or None, error message or None) in order of genomes
+    """
+    results = [None] * len(genomes)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_genome, name, input_dir, output_dir, manager, parallel, cache_dir, force,
+                               max_cache_size, compress, feature_types, workers, by_contig, cohort_dir): index
+                   for index, (name, input_dir, output_dir) in enumerate(genomes)}
+        for future in as_completed(futures):
+            index = futures[future]
+            name = genomes[index][0]
+            try:
+                results[index] = (name, future.result(), None)
+                print(name + ": done in %.2f s" % results[index][1])
+            except Exception as error:
+                results[index] = (name, None, type(error).__name__ + ": " + str(error))
+                print(name + ": failed, " + results[index][2])
+    return results
+
+
+def summary(results, elapsed):
+    """
+    Create the summary of the batch run
+    :param results: results of run_batch
+    :param elapsed: the total time of the batch run in seconds
+    :return: summary text
+    """
+    failed = [name for name, seconds, error in results if error is not None]
+    lines = ["Processed %d genomes in %.2f s (%d succeeded, %d failed), %.2f genomes/min" %
+             (len(results), elapsed, len(results) - len(failed), len(failed),
+              60 * len(results) / elapsed if elapsed else 0)]
+    if failed:
+        lines.append("Failed genomes: " + ", ".join(failed))
+        lines.extend("  " + name + ": " + error for name, seconds, error in results if error is not None)
+    return "\n".join(lines)
@@ -1,24 +1,76 @@
-import seaborn as sns
-import pkg_resources
-from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+import hashlib
+from importlib.resources import files
+import io
 import os
+import uuid
+from xml.sax.saxutils import escape
+from COGor import __version__
+from COGor.profiling import profiled
+from COGor.writer import atomic_output
+
+# seaborn (matplotlib) 'tab20' palette as 8-bit RGB, embedded so that seaborn is not needed
+TAB20 = [(31, 119, 180), (174, 199, 232), (255, 127, 14), (255, 187, 120), (44, 160, 44), (152, 223, 138),
+         (214, 39, 40), (255, 152, 150), (148, 103, 189), (197, 176, 213), (140, 86, 75), (196, 156, 148),
+         (227, 119, 194), (247, 182, 210), (127, 127, 127), (199, 199, 199), (188, 189, 34), (219, 219, 141),
+         (23, 190, 207), (158, 218, 229)]
+# other colors selected subjectively: six COG categories, tRNA, rRNA and ncRNA
+EXTRA_COLORS = [(255, 209, 49), (244, 172, 50), (219, 179, 177), (165, 190, 0), (61, 82, 213), (255, 238, 221),
+                (217, 3, 104), (250, 243, 62), (30, 252, 30)]
+# the color of features with unknown COG
+UNKNOWN_COLOR = (0, 0, 0)
+LEGEND_SIZE = (1700, 2500)
+LEGEND_FONT = "arial.ttf"
+LEGEND_FONT_SIZE = 50
+LEGEND_FORMATS = ("jpg", "svg")
+
+
+def palette():
+    """
+    Get the colors of the genome map: 26 COG categories (in the order of legend) followed by tRNA, rRNA and ncRNA
+    :return: list of RGB tuples
+    """
+    # the 20 colors of tab20 are scaled to 0-250 as in DNAPlotter
+    return [tuple(round(value / 255 * 250) for value in color) for color in TAB20] + EXTRA_COLORS
 
 
-def get_track_template(pos_track=(0.95, 0.90, 0.85, 0.80), size=10.0, output_dir=os.getcwd()):
+@profiled("get_track_template")
+def get_track_template(pos_track=(0.95, 0.90, 0.85, 0.80), size=10.0, output_dir=os.getcwd(), asset_dir=None):
     """
     Generate file for Track Manager option in DNAPlotter
     :param pos_track: the positions for plotting features (CDS forward strand, CDS reverse strand, pseudogenes, RNA genes)
     :param size: the size of track
     :param output_dir: the output file
+    :param asset_dir: the directory where the generated file is kept and linked (or copied) from, so that it is
+    generated only once for the same pos_track, size and palette (generated once per process if None)
     :return: track template file
     """
+    # the template is cached and saved by the written values (size 10 and 10.0 are equal, but give different files)
+    pos_track, size = tuple(str(pos) for pos in pos_track), str(size)
+    _save_asset(_track_template_text(pos_track, size).encode(), "track_template", "", (pos_track, size),
+                output_dir + "/track_template", asset_dir)
+
+
+def track_template_text(pos_track=(0.95, 0.90, 0.85, 0.80), size=10.0):
+    """
+    Create the content of the track template, see get_track_template
+    :return: string with one line per track
+    """
+    return _track_template_text(tuple(str(pos) for pos in pos_track), str(size))
+
+
+@lru_cache(maxsize=None)
+def _track_template_text(pos_track, size):
+    """
+    the track template of the positions and the size given as strings
+    """
     # position vector: 27x for CDS forward strand, 27x for CDS reverse strand, 27x for pseudogenes, 3x for RNA genes
-    pos = [str(pos_track[0]), str(pos_track[1])] * 27
-    pos.extend([str(pos_track[2])] * 27)
-    pos.extend([str(pos_track[3])] * 3)
+    pos = [pos_track[0], pos_track[1]] * 27
+    pos.extend([pos_track[2]] * 27)
+    pos.extend([pos_track[3]] * 3)
 
     # size vector
-    size = [str(size)] * 84
+    size = [size] * 84
 
     # forward strand: CDS...27x true, 27x false, pseudogenes...27x true, RNAs...3x true
     fwd = ["true", "false"] * 27
@@ -49,59 +101,130 @@ def get_track_template(pos_track=(0.95, 0.90, 0.85, 0.80), size=10.0, output_dir
            "P", "Q", "R", "S", "-"]
     VAL.extend(["null"] * 3)
 
-    # color palette: 20 colors have been chosen from seaborn palette and other ten were selected subjectively
-    palette = sns.color_palette('tab20')
-    palette2 = [(255, 209, 49), (244, 172, 50), (219, 179, 177), (165, 190, 0), (61, 82, 213), (255, 238, 221),
-                (217, 3, 104), (250, 243, 62), (30, 252, 30)]
-    palette = [str(round(color[0] * 250)) + ":" + str(round(color[1] * 250)) + ":" + str(round(color[2] * 250))
-               for color in palette]
-    palette2 = [str(color[0]) + ":" + str(color[1]) + ":" + str(color[2]) for color in palette2]
-    palette = palette + palette2
+    colors = [":".join(str(value) for value in color) for color in palette()]
+    black = ":".join(str(value) for value in UNKNOWN_COLOR)
 
     # add color palette to color vector
     COL = [0] * 78
     for i in range(2):
-        COL[i:52:2] = palette[:26]
-    COL[53:80] = palette[:26]
-    COL[52:53] = ["0:0:0", "0:0:0"]
-    COL.extend(["0:0:0", palette[26], palette[27], palette[28]])
+        COL[i:52:2] = colors[:26]
+    COL[53:80] = colors[:26]
+    COL[52:53] = [black, black]
+    COL.extend([black, colors[26], colors[27], colors[28]])
 
     # join all vectors into string
-    string = ''
-    for i in range(84):
-        string = string + pos[i] + "\t" + size[i] + "\t" + fwd[i] + "\t" + rev[i] + "\t" \
-                 + NOT[i] + "\t" + ANY[i] + "\t" + KEY[i] + "\t" + QUAL[i] + "\t" + VAL[i] + \
-                 "\t" + str(COL[i]) + "\n"
-
-    with open(output_dir + "/track_template", "w") as file_to_save:
-        file_to_save.write(string)
-        file_to_save.close()
+    return "".join("\t".join(row) + "\n" for row in zip(pos, size, fwd, rev, NOT, ANY, KEY, QUAL, VAL, COL))
 
 
-def get_legend(output_dir=os.getcwd()):
+@profiled("get_legend")
+def get_legend(output_dir=os.getcwd(), asset_dir=None, image_format="jpg"):
     """
     Create a legend for the genome map
+    :param output_dir: the output directory
+    :param asset_dir: the directory where the legend is kept and linked (or copied) from, so that it is rendered only
+    once (rendered once per process if None)
+    :param image_format: jpg (legend.jpg rendered with PIL) or svg (legend.svg, without rasterization)
+    """
+    if image_format not in LEGEND_FORMATS:
+        raise ValueError("Unknown legend format " + repr(image_format) + ", use one of " + ", ".join(LEGEND_FORMATS))
+    _save_asset(legend_data(image_format), "legend", "." + image_format, (image_format,),
+                output_dir + "/legend." + image_format, asset_dir)
+
+
+@lru_cache(maxsize=None)
+def legend_data(image_format="jpg"):
+    """
+    Create the content of the legend file, see get_legend
+    :return: bytes
     """
-    # color palette: 20 colors have been chosen from seaborn palette and other ten were selected subjectively
-    palette = sns.color_palette('tab20')
-    palette2 = [(255, 209, 49), (244, 172, 50), (219, 179, 177), (165, 190, 0), (61, 82, 213), (255, 238, 221),
-                (0, 0, 0), (217, 3, 104), (250, 243, 62), (30, 252, 30)]
-    palette = [((round(tuple[0] * 250)), round(tuple[1] * 250), round(tuple[2] * 250)) for tuple in palette]
-    palette = palette + palette2
-
-    # import description for the legend
-    file = pkg_resources.resource_filename(__name__, 'COGor-data/legend_text.csv')
-    CATS = (open(file, "r")).read()
-    CATS = CATS.split('\n')
+    # colors of the 26 COG categories, COG unknown, tRNA, rRNA and ncRNA
+    colors = palette()
+    colors = colors[:26] + [UNKNOWN_COLOR] + colors[26:]
+    labels = _legend_text()
+    if image_format == "svg":
+        return _svg_legend(colors, labels).encode()
+
+    # PIL is imported only when needed
+    from PIL import Image, ImageDraw, ImageFont
+
     # create a white image
-    img = Image.new("RGB", (1700, 2500), "white")
+    img = Image.new("RGB", LEGEND_SIZE, "white")
     image_edit = ImageDraw.Draw(img)
-    myFont = ImageFont.truetype('arial.ttf', 50)
+    try:
+        myFont = ImageFont.truetype(LEGEND_FONT, LEGEND_FONT_SIZE)
+    except OSError:
+        # the font is not installed (e.g. Linux), the default font of PIL is used instead (not scalable before 10.1)
+        try:
+            myFont = ImageFont.load_default(LEGEND_FONT_SIZE)
+        except TypeError:
+            myFont = ImageFont.load_default()
 
     # add individual objects to legend
     start = 50
-    for ind in range(len(palette)):
-        image_edit.rectangle((50, start, 50 + 80, start + 80), fill=(palette[ind][0], palette[ind][1], palette[ind][2]))
-        image_edit.text((150, start + 15), CATS[ind], font=myFont, fill=(0, 0, 0))
+    for color, label in zip(colors, labels):
+        image_edit.rectangle((50, start, 50 + 80, start + 80), fill=color)
+        image_edit.text((150, start + 15), label, font=myFont, fill=(0, 0, 0))
         start = start + 80
-    img.save(output_dir + '/legend.jpg')
+    data = io.BytesIO()
+    img.save(data, format="JPEG")
+    return data.getvalue()
+
+
+def _svg_legend(colors, labels):
+    """
+    the legend as SVG document with the same layout as the image
+    """
+    lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d">' % LEGEND_SIZE,
+             '<rect width="100%" height="100%" fill="white"/>']
+    start = 50
+    for color, label in zip(colors, labels):
+        lines.append('<rect x="50" y="%d" width="80" height="80" fill="rgb(%d,%d,%d)"/>' % ((start,) + color))
+        lines.append('<text x="150" y="%d" font-family="Arial, Helvetica, sans-serif" font-size="%d" '
+                     'dominant-baseline="hanging">%s</text>' % (start + 15, LEGEND_FONT_SIZE, escape(label)))
+        start = start + 80
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def _legend_text():
+    """
+    the descriptions of the legend, one per color
+    """
+    return files("COGor").joinpath("COGor-data").joinpath("legend_text.csv").read_text().split("\n")
+
+
+def _save_asset(data, name, suffix, params, file, asset_dir):
+    """
+    save the generated data into the file, through the asset directory if given: the data is written there once
+    under a name derived from the parameters, the palette and the version, and then linked (or copied) to the file
+    """
+    if asset_dir is None:
+        _write_data(data, file)
+        return
+
+    key = hashlib.sha256(repr((__version__, name, params, palette(), UNKNOWN_COLOR, _legend_text())).encode())
+    asset = os.path.join(asset_dir, name + "-" + key.hexdigest()[:16] + suffix)
+    if not os.path.isfile(asset):
+        os.makedirs(asset_dir, exist_ok=True)
+        _write_data(data, asset)
+    if os.path.isfile(file) and os.path.samefile(asset, file):
+        # already linked, renaming a link over another link of the same file would do nothing
+        return
+
+    # the link is created under a temporary name and renamed, as the file may already exist
+    temp = os.path.join(os.path.dirname(os.path.abspath(file)), "." + uuid.uuid4().hex + ".tmp")
+    try:
+        os.link(asset, temp)
+    except OSError:
+        # hard links are not supported (e.g. other file system)
+        _write_data(data, file)
+        return
+    os.replace(temp, file)
+
+
+def _write_data(data, file):
+    """
+    write the bytes into the file atomically, see writer.atomic_output
+    """
+    with atomic_output(file, False) as output:
+        output.write(data)
@@ -0,0 +1,183 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import json
+import os
+import signal
+import time
+from COGor.runner import genome_files, discover_genomes, run_genome, summary
+from COGor.writer import atomic_output
+from COGor import profiling
+
+# seconds between two scans of the input directory
+DEFAULT_INTERVAL = 5.0
+# maximal number of genomes waiting for a worker, other complete genomes stay in the input directory until there is room
+DEFAULT_QUEUE_SIZE = 100
+
+
+def warm_up():
+    """
+    Prepare the worker process before its first job: import the processing modules and load the COG index,
+    so that they are loaded once per worker and not for every genome. Ctrl+C is left to the main process,
+    which lets the running genomes finish.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    import COGor.runner
+    from COGor.cog_index import load_cog_index
+    load_cog_index()
+
+
+def genome_signature(organism_name, input_dir):
+    """
+    Get the size and modification time of each input file of the genome
+    :param organism_name: the name of the organism
+    :param input_dir: the input directory
+    :return: tuple of (size, mtime) for each input file, None if some file is missing
+    """
+    try:
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in
+                     (os.stat(file) for file in genome_files(organism_name, input_dir).values()))
+    except FileNotFoundError:
+        return None
+
+
+def watch(input_dir, output_dir, jobs=1, interval=DEFAULT_INTERVAL, max_queue=DEFAULT_QUEUE_SIZE, status_file=None,
+          **options):
+    """
+    Watch the input directory and process every genome when all its input files have arrived, until interrupted
+    (Ctrl+C or SIGTERM). A genome is queued when its complete set of files has not changed between two scans,
+    it is processed again if its files change later (after it is finished if it is queued or running). Each genome
+    is saved into output_dir/organism_name. If a worker process dies, its genomes fail and the workers are restarted.
+    :param input_dir: the watched input directory
+    :param output_dir: the output directory
+    :param jobs: the number of genomes processed at the same time, the worker processes are reused for all genomes
+    :param interval: seconds between two scans of the input directory
+    :param max_queue: maximal number of genomes waiting for a worker
+    :param status_file: the path to JSON file with the state of the service (queue depth, running genomes, latency),
+    rewritten after every scan (no file if None)
+    :param options: other parameters of runner.run_genome (manager, cache_dir, compress, ...)
+    :return: list of tuples (organism_name, time in seconds or None, error message or None) in order of completion
+    """
+    stopped = []
+    handlers = {number: signal.signal(number, lambda *args: stopped.append(True))
+                for number in (signal.SIGINT, signal.SIGTERM)}
+    # the last seen and the last queued signature of each complete genome
+    seen, queued = {}, {}
+    # queue of (organism_name, time of queuing), running genomes future -> (organism_name, time of queuing, start)
+    queue, running = deque(), {}
+    results, latencies = [], []
+    start = time.perf_counter()
+    print("Watching " + input_dir + " with %d workers" % jobs)
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up)
+    try:
+        while not stopped:
+            # genomes already queued or running are queued again only after they are finished, so that the same
+            # output directory is never written by two workers
+            busy = {name for name, queue_time in queue} | {name for name, queue_time, start in running.values()}
+            for organism_name, signature in _complete_genomes(input_dir):
+                if signature == queued.get(organism_name) or organism_name in busy:
+                    seen[organism_name] = signature
+                    continue
+                # the genome is queued only if its files did not change since the previous scan (copying ended)
+                if signature == seen.get(organism_name) and len(queue) < max_queue:
+                    queue.append((organism_name, time.perf_counter()))
+                    queued[organism_name] = signature
+                seen[organism_name] = signature
+
+            while queue and len(running) < jobs:
+                organism_name, queue_time = queue[0]
+                try:
+                    future = pool.submit(run_genome, organism_name, input_dir, os.path.join(output_dir, organism_name),
+                                         **options)
+                except BrokenProcessPool:
+                    # a worker died (e.g. killed for memory), its genomes fail and a new pool is started
+                    print("A worker process died, restarting the workers")
+                    for future in list(running):
+                        _finish(future, *running.pop(future), len(queue), results, latencies)
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up)
+                    continue
+                queue.popleft()
+                running[future] = (organism_name, queue_time, time.perf_counter())
+
+            if status_file is not None:
+                _write_status(status_file, queue, running, results, latencies)
+            if running:
+                done = wait(running, timeout=interval, return_when=FIRST_COMPLETED)[0]
+            else:
+                done = ()
+                _sleep(interval, stopped)
+            for future in done:
+                _finish(future, *running.pop(future), len(queue), results, latencies)
+
+        # the queued genomes are left for the next start and the running genomes are finished
+        print("Stopping: %d queued genomes are not processed, waiting for %d running genomes" %
+              (len(queue), len(running)))
+        for future in list(running):
+            _finish(future, *running.pop(future), 0, results, latencies)
+    finally:
+        pool.shutdown()
+        for number, handler in handlers.items():
+            signal.signal(number, handler)
+    if status_file is not None:
+        _write_status(status_file, queue, running, results, latencies)
+    print(summary(results, time.perf_counter() - start))
+    return results
+
+
+def _complete_genomes(input_dir):
+    """
+    the names and signatures of genomes with all input files in the input directory
+    """
+    try:
+        names = discover_genomes(input_dir)
+    except OSError as error:
+        print("Cannot read the input directory: " + str(error))
+        return []
+    genomes = [(organism_name, genome_signature(organism_name, input_dir)) for organism_name in names]
+    return [(organism_name, signature) for organism_name, signature in genomes if signature is not None]
+
+
+def _sleep(seconds, stopped):
+    """
+    sleep until the next scan, the sleep is cut short when the service is stopped
+    """
+    end = time.perf_counter() + seconds
+    while not stopped and time.perf_counter() < end:
+        time.sleep(min(0.1, seconds))
+
+
+def _finish(future, organism_name, queue_time, start, queue_depth, results, latencies):
+    """
+    wait for the genome, report its result and latency (from queuing to the end of processing)
+    """
+    try:
+        result = (organism_name, future.result(), None)
+    except Exception as error:
+        result = (organism_name, None, type(error).__name__ + ": " + str(error))
+    end = time.perf_counter()
+    results.append(result)
+    latencies.append(end - queue_time)
+    status = "done in %.2f s" % result[1] if result[2] is None else "failed, " + result[2]
+    print(organism_name + ": " + status + " (latency %.2f s, waited %.2f s, queue depth %d)" %
+          (end - queue_time, start - queue_time, queue_depth))
+    profiling.record("watch", genome=organism_name, status="ok" if result[2] is None else "error",
+                     error=result[2], seconds=result[1], latency=end - queue_time, waited=start - queue_time,
+                     queue_depth=queue_depth)
+
+
+def _write_status(status_file, queue, running, results, latencies):
+    """
+    save the state of the service (see writer.atomic_output)
+    """
+    now = time.perf_counter()
+    state = {"time": time.time(), "queue_depth": len(queue), "queued": [name for name, queue_time in queue],
+             "running": {name: now - start for name, queue_time, start in running.values()},
+             "done": sum(error is None for name, seconds, error in results),
+             "failed": [name for name, seconds, error in results if error is not None],
+             "latency": {"last": latencies[-1] if latencies else None,
+                         "mean": sum(latencies) / len(latencies) if latencies else None,
+                         "max": max(latencies, default=None)}}
+    with atomic_output(status_file, False) as output:
+        output.write(json.dumps(state, indent=2).encode())
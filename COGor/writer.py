@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+import gzip
+import os
+import re
+import shutil
+import uuid
+from COGor.program_processor import GFF_COLUMNS, render_attributes
+from COGor.readers import iter_fasta_records
+from COGor.profiling import profiled, count
+
+# the size of chunks used for copying the genomic sequence (bytes) and for writing the features (rows)
+COPY_CHUNK_SIZE = 1024 * 1024
+ROWS_CHUNK_SIZE = 10000
+
+
+@profiled("write_plot_file")
+def write_plot_file(df, fasta_file, file, compress=None):
+    """
+    Save the consensus dataframe into file for DNAPlotter and add genomic sequence. The features are written in chunks
+    and the sequence is copied without loading it into memory. The file is written into a temporary file that is
+    renamed at the end, so the file is never left half-written.
+    :param df: DataFrame with gff columns (the attribute may be split into columns ID, COG, CAT, name and desc)
+    :param fasta_file: the path to genomic sequence (may be gzipped)
+    :param file: the path to output file
+    :param compress: gzip the output file, by default if the file name ends with .gz
+    """
+    count(rows=len(df))
+    with atomic_output(file, compress) as output:
+        _write_features(df, output)
+        output.write(b"\n")
+        _copy_fasta(fasta_file, output)
+
+
+@profiled("write_plot_file")
+def write_contig_plot_files(df, fasta_file, output_dir, compress=False):
+    """
+    Save one file for DNAPlotter per replicon (sequence record of the fasta file), each file contains the features
+    of the replicon and its sequence. The fasta file is read record by record.
+    :param df: DataFrame with gff columns (the attribute may be split into columns ID, COG, CAT, name and desc)
+    :param fasta_file: the path to genomic sequence with one or more records (may be gzipped)
+    :param output_dir: the output directory
+    :param compress: save gzipped files
+    :return: list of the paths to saved files (file_to_plot_<record id>.txt), in the order of the fasta records.
+    Features of contigs that are not in the fasta file are not saved, they are reported and counted (unplaced).
+    """
+    count(rows=len(df))
+    seqnames = df["seqname"].astype(str).values
+    files, record_ids = [], set()
+    for record_id, record in iter_fasta_records(fasta_file):
+        file = os.path.join(output_dir, contig_plot_file(record_id, compress))
+        with atomic_output(file, compress) as output:
+            _write_features(df.loc[seqnames == record_id], output)
+            output.write(b"\n")
+            output.writelines(record)
+        files.append(file)
+        record_ids.add(record_id)
+
+    unplaced = [seqname for seqname in seqnames if seqname not in record_ids]
+    count(unplaced=len(unplaced))
+    if unplaced:
+        print("Warning: %d features are not saved, their contigs are not in %s: %s" %
+              (len(unplaced), fasta_file, ", ".join(sorted(set(unplaced)))))
+    return files
+
+
+def contig_plot_file(record_id, compress=False):
+    """
+    the name of the file for DNAPlotter with one replicon, characters not allowed in file names are replaced by '_'
+    """
+    return "file_to_plot_" + re.sub(r"[^\w.\-]", "_", record_id) + ".txt" + (".gz" if compress else "")
+
+
+@contextmanager
+def atomic_output(file, compress=None):
+    """
+    Open binary file object for writing into a temporary file that is renamed to file at the end, so the file
+    is never left half-written. The temporary file is removed if writing fails.
+    :param file: the path to output file
+    :param compress: gzip the output file, by default if the file name ends with .gz
+    """
+    compress = str(file).endswith(".gz") if compress is None else compress
+    temp = os.path.join(os.path.dirname(os.path.abspath(file)), "." + os.path.basename(file) + "." +
+                        uuid.uuid4().hex + ".tmp")
+    try:
+        with open(temp, "xb") as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as output:
+                    yield output
+            else:
+                yield raw
+        os.replace(temp, file)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def _write_features(df, output):
+    """
+    write the features in gff format into the binary file object
+    """
+    for start in range(0, len(df), ROWS_CHUNK_SIZE):
+        chunk = df.iloc[start:start + ROWS_CHUNK_SIZE]
+        chunk = chunk.assign(attribute=render_attributes(chunk))[GFF_COLUMNS]
+        output.write(chunk.to_csv(sep='\t', index=False, header=False).encode())
+
+
+def _copy_fasta(fasta_file, output):
+    """
+    copy the genomic sequence into the binary file object
+    """
+    if fasta_file.endswith(".gz"):
+        with gzip.open(fasta_file, "rb") as fasta_data:
+            shutil.copyfileobj(fasta_data, output, COPY_CHUNK_SIZE)
+    else:
+        with open(fasta_file, "rb") as fasta_data:
+            copy_file_data(fasta_data, output)
+
+
+def copy_file_data(source, target):
+    """
+    Copy the content of the source file object to the target file object, zero-copy sendfile is used if possible
+    """
+    offset = None
+    if hasattr(os, "sendfile") and not isinstance(target, gzip.GzipFile):
+        try:
+            target.flush()
+            offset = start = source.tell()
+            while True:
+                sent = os.sendfile(target.fileno(), source.fileno(), offset, COPY_CHUNK_SIZE)
+                if sent == 0:
+                    break
+                offset += sent
+            target.seek(0, os.SEEK_END)
+            return
+        except (OSError, AttributeError, ValueError):
+            # sendfile is not supported for these files, nothing has been copied yet
+            if offset is not None and offset != start:
+                raise
+    shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
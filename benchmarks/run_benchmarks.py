@@ -0,0 +1,225 @@
+"""
+Benchmark of the startup (import time) and every stage of COG-or on synthetic genomes of different sizes, the results
+are saved as JSON report that can be compared with the report of another version to catch scaling regressions.
+
+usage: python run_benchmarks.py [-g 1000,5000,20000] [-c contigs] [-r repeats] [-o report.json] [-b baseline.json]
+                                [-t threshold]
+"""
+import getopt
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from COGor import __version__
+from COGor.program_processor import em_processor, om_processor, batch_processor
+from COGor.consensus import consensus, consensus_table, get_features, read_file
+from COGor.track_manager import get_track_template, _track_template_text
+from synthetic import generate
+
+DEFAULT_GENES = (1000, 5000, 20000)
+STAGES = ("em_processor", "om_processor", "batch_processor", "consensus", "get_features", "get_track_template")
+# the imports measured in a fresh interpreter: the package and the command line interface
+STARTUP_IMPORTS = {"import_package": "import COGor", "import_cli": "import COGor.cogor"}
+
+
+def stage_calls(files, output_dir, organism_name):
+    """
+    Prepare the calls of the benchmarked stages for the generated genome, the stages are called in this order
+    and each stage may use the outputs of the previous ones
+    :param files: dictionary with the paths to generated files (see synthetic.generate)
+    :param output_dir: the output directory
+    :param organism_name: the name of the organism
+    :return: list of tuples (stage, function without arguments)
+    """
+    em_file, om_file, batch_file = [os.path.join(output_dir, tool + "_" + organism_name + ".gff")
+                                    for tool in ("em", "om", "batch")]
+    consensus_data = {}
+
+    def features():
+        # the consensus table is prepared outside of the measured call
+        get_features(files["gff"], consensus_data["df"].copy(), True, True)
+
+    def track_template():
+        # the template is memoized, it is generated again in every measured call
+        _track_template_text.cache_clear()
+        get_track_template(output_dir=output_dir)
+
+    return [("em_processor", lambda: em_processor(organism_name, files["em"], files["cds"], output_dir)),
+            ("om_processor", lambda: om_processor(organism_name, files["orf"], files["cog"], output_dir)),
+            ("batch_processor", lambda: batch_processor(organism_name, files["batch"], output_dir)),
+            ("consensus", lambda: consensus(em_file, om_file, batch_file, files["fasta"], True, True, files["gff"],
+                                            output_dir)),
+            ("prepare", lambda: consensus_data.update(df=consensus_table(read_file(em_file), read_file(om_file),
+                                                                         read_file(batch_file)))),
+            ("get_features", features),
+            ("get_track_template", track_template)]
+
+
+def measure(function, repeats=3):
+    """
+    Measure the time and memory of the function, the time is the best of the repeated calls and the memory is
+    the peak of memory allocated by Python (tracemalloc) during one more call
+    :return: dictionary with seconds, all measured times and peak_mb
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "times": times, "peak_mb": peak / 1024 ** 2}
+
+
+def measure_startup(repeats=3):
+    """
+    Measure the time of importing the package and the command line interface in a fresh Python interpreter,
+    the time of starting the interpreter itself is subtracted
+    :return: dictionary import -> {seconds, times}
+    """
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + [os.environ.get("PYTHONPATH", "")]))
+
+    def best(code):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, env=environment)
+            times.append(time.perf_counter() - start)
+        return times
+
+    interpreter = min(best("pass"))
+    startup = {}
+    for name, code in STARTUP_IMPORTS.items():
+        times = [seconds - interpreter for seconds in best(code)]
+        startup[name] = {"seconds": min(times), "times": times}
+        print("startup %-26s %8.3f s" % (name, startup[name]["seconds"]))
+    return startup
+
+
+def run_benchmarks(genes=DEFAULT_GENES, n_contigs=1, repeats=3, seed=0):
+    """
+    Generate synthetic genome of each size and benchmark all stages
+    :param genes: the numbers of genes of the generated genomes
+    :param n_contigs: the number of contigs of each genome
+    :param repeats: the number of timed calls of each stage
+    :param seed: the seed of the generator
+    :return: report dictionary
+    """
+    report = {"version": __version__, "commit": _commit(), "python": platform.python_version(),
+              "platform": platform.platform(), "repeats": repeats, "startup": measure_startup(repeats),
+              "results": []}
+    for n_genes in genes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            files = generate(os.path.join(work_dir, "input"), "synth", n_genes, n_contigs, seed)
+            output_dir = os.path.join(work_dir, "output")
+            os.makedirs(output_dir)
+            result = {"genes": n_genes, "contigs": n_contigs, "stages": {}}
+            for stage, function in stage_calls(files, output_dir, "synth"):
+                if stage not in STAGES:
+                    function()
+                    continue
+                result["stages"][stage] = measure(function, repeats)
+                print("%6d genes %-20s %8.4f s %8.1f MB" % (n_genes, stage, result["stages"][stage]["seconds"],
+                                                            result["stages"][stage]["peak_mb"]))
+            report["results"].append(result)
+    return report
+
+
+def compare(report, baseline, threshold=1.5):
+    """
+    Compare the report with the report of another version
+    :param report: the new report
+    :param baseline: the baseline report
+    :param threshold: the ratio of times (new / baseline) considered as regression
+    :return: list of tuples (genes, contigs, stage, ratio) of the regressed stages, genes and contigs are 0 for startup
+    """
+    baseline_stages = {(result["genes"], result["contigs"], stage): values for result in baseline["results"]
+                       for stage, values in result["stages"].items()}
+    regressions = []
+    for name, values in report.get("startup", {}).items():
+        old = baseline.get("startup", {}).get(name)
+        if old is not None and old["seconds"] > 0:
+            ratio = values["seconds"] / old["seconds"]
+            print("startup %-26s %8.3f s -> %8.3f s  x%.2f" % (name, old["seconds"], values["seconds"], ratio))
+            if ratio > threshold:
+                regressions.append((0, 0, name, ratio))
+    for result in report["results"]:
+        for stage, values in result["stages"].items():
+            old = baseline_stages.get((result["genes"], result["contigs"], stage))
+            if old is None or not old["seconds"]:
+                continue
+            ratio = values["seconds"] / old["seconds"]
+            print("%6d genes %-20s %8.4f s -> %8.4f s  x%.2f" % (result["genes"], stage, old["seconds"],
+                                                                  values["seconds"], ratio))
+            if ratio > threshold:
+                regressions.append((result["genes"], result["contigs"], stage, ratio))
+    return regressions
+
+
+def _commit():
+    """
+    the current git commit of the repository, None if it is not available
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    genes = DEFAULT_GENES
+    n_contigs = 1
+    repeats = 3
+    report_file = "benchmark_report.json"
+    baseline_file = None
+    threshold = 1.5
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "g:c:r:o:b:t:")
+        for opt, arg in opts:
+            if opt == "-g":
+                genes = tuple(int(number) for number in arg.split(","))
+            elif opt == "-c":
+                n_contigs = int(arg)
+            elif opt == "-r":
+                repeats = int(arg)
+            elif opt == "-o":
+                report_file = arg
+            elif opt == "-b":
+                baseline_file = arg
+            elif opt == "-t":
+                threshold = float(arg)
+    except (getopt.GetoptError, ValueError):
+        print(__doc__)
+        sys.exit(2)
+
+    report = run_benchmarks(genes, n_contigs, repeats)
+    with open(report_file, "w") as file:
+        json.dump(report, file, indent=2)
+
+    if baseline_file is not None:
+        with open(baseline_file, "r") as file:
+            regressions = compare(report, json.load(file), threshold)
+        for n_genes, contigs, stage, ratio in regressions:
+            print("Regression: %s%s is %.2f times slower" % (stage, " with %d genes" % n_genes if n_genes else "",
+                                                              ratio))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Generator of synthetic genomes with all input files of COG-or in the formats of the real tools
+"""
+import os
+import random
+import sys
+
+COGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "COGor", "COGor-data", "cogs.txt")
+CATEGORIES = "JAKLBDYVTMNZWUOXCGEFHIPQRS"
+DESCRIPTIONS = ["Glutamate-1-semialdehyde aminotransferase", "ABC transporter, permease protein",
+                "Transcriptional regulator", "hypothetical protein", "DNA polymerase III subunit alpha",
+                "Belongs to the UPF0753 family"]
+BATCH_HEADER = ["#Batch CD-search tool\tNIH/NLM/NCBI", "#cdsid\tQM3-qcdsearch-0000", "#datatype\thitsConcise Results",
+                "#status\tsuccess", "", "Query\tHit type\tPSSM-ID\tFrom\tTo\tE-Value\tBitscore\tAccession\tShort name"
+                "\tIncomplete\tSuperfamily"]
+
+
+def generate(output_dir, organism_name="synth", n_genes=1000, n_contigs=1, seed=0, fuzzy=0.1):
+    """
+    Generate synthetic genome and save the input files of COG-or named according to the naming convention
+    (organism_name_eggnog.gff, _cds.txt, _orf_operon.txt, _cog_operon.txt, _batch.txt, .fasta and .gff3).
+    CDS locations include complement, join and partial (< and >) locations, some features of Operon-mapper
+    have different start and some genes are pseudogenes or RNA genes.
+    :param output_dir: the output directory
+    :param organism_name: the name of the organism
+    :param n_genes: the number of genes
+    :param n_contigs: the number of contigs, genes are distributed evenly among the contigs
+    :param seed: the seed of random generator, the same seed gives the same files
+    :param fuzzy: the fraction of Operon-mapper features with shifted start
+    :return: dictionary with the paths to generated files
+    """
+    rnd = random.Random(seed)
+    with open(COGS_FILE, "r") as file:
+        cogs = [line.split("\t")[0] for line in file if line.strip()]
+    os.makedirs(output_dir, exist_ok=True)
+
+    contigs = ["NZ_SYN%06d.1" % (number + 1) for number in range(n_contigs)]
+    genes, lengths = [], {}
+    for number, contig in enumerate(contigs):
+        position = rnd.randint(1, 300)
+        for _ in range(n_genes // n_contigs + (number < n_genes % n_contigs)):
+            end = position + rnd.randint(30, 900) * 3 - 1
+            genes.append({"contig": contig, "start": position, "end": end, "strand": rnd.choice("+-"),
+                          "id": len(genes) + 1, "kind": rnd.random(), "cog": rnd.choice(cogs)})
+            position = end + rnd.randint(5, 200)
+        lengths[contig] = position + 100
+
+    lines = {"cds": [], "em": ["##gff-version 3"], "orf": [], "cog": [], "batch": list(BATCH_HEADER),
+             "gff": ["##gff-version 3"]}
+    for query, gene in enumerate(genes, start=1):
+        header = _cds_header(rnd, gene)
+        lines["cds"].extend([">" + header, "ATG" * ((gene["end"] - gene["start"] + 1) // 3)])
+        if rnd.random() < 0.85:
+            lines["em"].append(_eggnog_line(rnd, gene, header.split(" ")[0]))
+        lines["orf"].append(_orf_line(rnd, gene, fuzzy))
+        if lines["orf"][-1].split("\t")[2] == "CDS" and rnd.random() < 0.8:
+            lines["cog"].append(_cog_line(rnd, gene, cogs))
+        lines["batch"].extend(_hit_lines(rnd, gene, header, query, cogs))
+        lines["gff"].extend(_gff_lines(gene))
+    for contig in contigs:
+        for number in range(max(1, len(genes) // len(contigs) // 200)):
+            start = rnd.randint(1, lengths[contig] - 200)
+            lines["gff"].append("\t".join([contig, "RefSeq", rnd.choice(["ncRNA", "tRNA", "rRNA", "tmRNA"]),
+                                           str(start), str(start + 80), ".", rnd.choice("+-"), ".",
+                                           "ID=rna-%s-%d" % (contig, number)]))
+
+    files = {key: os.path.join(output_dir, organism_name + suffix) for key, suffix in
+             (("cds", "_cds.txt"), ("em", "_eggnog.gff"), ("orf", "_orf_operon.txt"), ("cog", "_cog_operon.txt"),
+              ("batch", "_batch.txt"), ("gff", ".gff3"), ("fasta", ".fasta"))}
+    for key, file_lines in lines.items():
+        with open(files[key], "w") as file:
+            file.write("\n".join(file_lines) + "\n")
+    with open(files["fasta"], "w") as file:
+        for contig in contigs:
+            file.write(">" + contig + " synthetic contig\n")
+            sequence = "".join(rnd.choices("ACGT", k=lengths[contig]))
+            file.writelines(sequence[start:start + 80] + "\n" for start in range(0, len(sequence), 80))
+    return files
+
+
+def _cds_header(rnd, gene):
+    """
+    NCBI header of the CDS with complement, join or partial location
+    """
+    start, end = gene["start"], gene["end"]
+    kind = rnd.random()
+    if kind < 0.05:
+        location = "<%d..%d" % (start, end)
+    elif kind < 0.1:
+        location = "%d..>%d" % (start, end)
+    elif kind < 0.15:
+        middle = (start + end) // 2
+        location = "join(%d..%d,%d..%d)" % (start, middle, middle + 1, end)
+    else:
+        location = "%d..%d" % (start, end)
+    if gene["strand"] == "-":
+        location = "complement(" + location + ")"
+    protein = "WP_%09d.1" % gene["id"]
+    return "lcl|%s_prot_%s_%d [gene=gen%d] [locus_tag=SYN_%05d] [protein=%s] [protein_id=%s] [location=%s] " \
+           "[gbkey=CDS]" % (gene["contig"], protein, gene["id"], gene["id"], gene["id"], rnd.choice(DESCRIPTIONS),
+                            protein, location)
+
+
+def _eggnog_line(rnd, gene, seq_id):
+    """
+    line of eggNOG-mapper decorated gff, 80 % of the orthologous groups are COGs
+    """
+    group = gene["cog"] if rnd.random() < 0.8 else "%X" % rnd.randint(0x10000, 0xFFFFF)
+    attributes = ["ID=" + seq_id, "em_target=1234.SYN_%05d" % gene["id"], "em_score=%.1f" % rnd.uniform(50, 900),
+                  "em_evalue=1e-20", "em_tcov=100.0", "em_OGs=%s@1|root,%s@2|Bacteria" % (group, group),
+                  "em_COG_cat=" + rnd.choice(CATEGORIES + "-"), "em_desc=" + rnd.choice(DESCRIPTIONS)]
+    if rnd.random() < 0.7:
+        attributes.append("em_Preferred_name=gen%d" % gene["id"])
+    return "\t".join([seq_id, "Prodigal_v2.6.3", "CDS", "1", str((gene["end"] - gene["start"] + 1) // 3), "0.0", "+",
+                      "0", ";".join(attributes)])
+
+
+def _orf_line(rnd, gene, fuzzy):
+    """
+    line of Operon-mapper ORFs_coordinates.txt, RNA genes for 3 % of the genes
+    """
+    start = gene["start"] + (rnd.choice([0, 3, 6, 12]) if rnd.random() < fuzzy else 0)
+    feature = "CDS" if gene["kind"] > 0.03 else rnd.choice(["tRNA", "rRNA"])
+    return "\t".join([gene["contig"], "Operon-mapper", feature, str(start), str(gene["end"]), ".", gene["strand"], "0",
+                      "ID=ORF_%d" % gene["id"]])
+
+
+def _cog_line(rnd, gene, cogs):
+    """
+    line of Operon-mapper predicted_COGs.txt, including ROGs and COGs missing in the COG definitions
+    """
+    kind = rnd.random()
+    if kind < 0.03:
+        return "ORF_%d\tROG%05d\t[S] -" % (gene["id"], gene["id"])
+    cog = "COG9%03d" % rnd.randint(0, 999) if kind < 0.06 else \
+        gene["cog"] if rnd.random() < 0.8 else rnd.choice(cogs)
+    return "ORF_%d\t%s\t[%s] %s" % (gene["id"], cog, rnd.choice(CATEGORIES), rnd.choice(DESCRIPTIONS))
+
+
+def _hit_lines(rnd, gene, header, query, cogs):
+    """
+    lines of Batch CD-Search hitdata.txt for one query with specific, non-specific and superfamily hits
+    """
+    hits = []
+    if rnd.random() < 0.3:
+        hits.append(("non-specific", rnd.choice(cogs)))
+    if rnd.random() < 0.75:
+        hits.append(("specific", gene["cog"] if rnd.random() < 0.8 else rnd.choice(cogs)))
+        if rnd.random() < 0.3:
+            hits.append(("specific", rnd.choice(cogs)))
+    if rnd.random() < 0.3:
+        hits.append(("superfamily", "cl%05d" % rnd.randint(0, 99999)))
+    return ["Q#%d - >%s\t%s\t%d\t1\t%d\t1.2e-30\t%.2f\t%s\tShort%d\t-\tcl%05d" %
+            (query, header, hit, rnd.randint(200000, 400000), (gene["end"] - gene["start"]) // 3,
+             rnd.uniform(30, 900), accession, query, rnd.randint(0, 99999)) for hit, accession in hits]
+
+
+def _gff_lines(gene):
+    """
+    lines of the reference gff3 file, 1 % of the genes are pseudogenes
+    """
+    lines = []
+    if gene["kind"] < 0.01:
+        lines.append("\t".join([gene["contig"], "RefSeq", "pseudogene", str(gene["start"]), str(gene["end"]), ".",
+                                gene["strand"], ".", "ID=gene-SYN_%05d;pseudo=true" % gene["id"]]))
+    lines.append("\t".join([gene["contig"], "RefSeq", "gene", str(gene["start"]), str(gene["end"]), ".",
+                            gene["strand"], ".", "ID=gene-SYN_%05d" % gene["id"]]))
+    return lines
+
+
+if __name__ == "__main__":
+    # usage: python synthetic.py output_dir organism_name n_genes [n_contigs] [seed]
+    generate(sys.argv[1], sys.argv[2], int(sys.argv[3]), *[int(arg) for arg in sys.argv[4:6]])
@@ -14,8 +14,9 @@ setup(
   download_url = 'https://github.com/xpolak37/the-COG-or/archive/refs/tags/0.4.tar.gz',
   keywords = ['Bacterial genome', 'Functional annotation', 'bioinformatics', 'COG'],
   install_requires=[
-          'regex', 'pandas', 'Bio', 'seaborn', 'pillow'
+          'regex', 'pandas', 'pillow'
       ],
+  entry_points={"console_scripts": ["cogor = COGor.cogor:cogor"]},
   classifiers=[
     'Development Status :: 4 - Beta',
     'Intended Audience :: Developers',
@@ -0,0 +1,29 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from synthetic import generate
+
+
+@pytest.fixture(scope="session")
+def genome(tmp_path_factory):
+    """
+    synthetic genome with three contigs, see benchmarks/synthetic.py
+    """
+    return generate(str(tmp_path_factory.mktemp("genome")), "synth", 300, 3, seed=1)
+
+
+@pytest.fixture
+def no_batch_genome(genome, tmp_path):
+    """
+    the synthetic genome whose Batch CD-Search hitdata has no specific hits, so the processed batch table is empty
+    """
+    files = dict(genome)
+    files["batch"] = str(tmp_path / "synth_batch.txt")
+    with open(genome["batch"], "r") as source, open(files["batch"], "w") as target:
+        target.writelines(line for line in source if "\tspecific\t" not in line)
+    return files
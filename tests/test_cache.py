@@ -0,0 +1,23 @@
+import gzip
+import os
+from COGor.runner import run_genome
+from COGor.cache import evict, ASSET_DIR
+
+
+def test_compressed_output_is_not_restored_from_plain_cache(genome, tmp_path):
+    input_dir = os.path.dirname(genome["em"])
+    cache_dir = str(tmp_path / "cache")
+    run_genome("synth", input_dir, str(tmp_path / "plain"), cache_dir=cache_dir)
+    run_genome("synth", input_dir, str(tmp_path / "gz"), cache_dir=cache_dir, compress=True)
+    with open(tmp_path / "plain" / "file_to_plot.txt", "rb") as plain, \
+            gzip.open(tmp_path / "gz" / "file_to_plot.txt.gz", "rb") as compressed:
+        assert compressed.read() == plain.read()
+
+
+def test_evict_keeps_assets(genome, tmp_path):
+    input_dir = os.path.dirname(genome["em"])
+    cache_dir = str(tmp_path / "cache")
+    run_genome("synth", input_dir, str(tmp_path / "out"), manager=True, cache_dir=cache_dir)
+    evict(cache_dir, 0)
+    assert os.listdir(cache_dir) == [ASSET_DIR]
+    assert len(os.listdir(os.path.join(cache_dir, ASSET_DIR))) == 3
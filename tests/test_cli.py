@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+@pytest.mark.parametrize("command", [[os.path.join(ROOT, "COGor", "cogor.py")], ["-m", "COGor.cogor"]])
+def test_command_line(genome, tmp_path, command):
+    # the script is run from an uninstalled source tree as documented in README
+    environment = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    subprocess.run([sys.executable] + command + ["-n", "synth", "-i", os.path.dirname(genome["em"]), "-o",
+                                                 str(tmp_path)], check=True, cwd=ROOT, env=environment)
+    assert os.path.isfile(tmp_path / "file_to_plot.txt")
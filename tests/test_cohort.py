@@ -0,0 +1,22 @@
+import os
+from COGor.cohort import write_table, read_table, add_genome, cohort_genomes, category_counts
+from COGor.consensus import consensus_table
+from COGor.program_processor import em_table, om_table, batch_table
+
+
+def test_cohort_store(genome, tmp_path):
+    df = consensus_table(em_table(genome["em"], genome["cds"]), om_table(genome["orf"], genome["cog"]),
+                         batch_table(genome["batch"]))
+    table_file = str(tmp_path / "consensus.npz")
+    write_table(df, table_file)
+    table = read_table(table_file)
+    assert table["start"].tolist() == df["start"].astype(int).tolist()
+    assert table["COG"].astype(str).tolist() == df["COG"].astype(object).fillna("-").astype(str).tolist()
+
+    store_dir = str(tmp_path / "store")
+    add_genome(store_dir, "a", df)
+    add_genome(store_dir, "b", table_file)
+    assert cohort_genomes(store_dir) == ["a", "b"]
+    assert sorted(os.listdir(store_dir)) == ["a.npz", "b.npz"]
+    counts = category_counts(store_dir)
+    assert (counts.loc["a"] == counts.loc["b"]).all()
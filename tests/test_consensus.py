@@ -0,0 +1,71 @@
+import os
+import pandas as pd
+import pytest
+from COGor.pipeline import run_pipeline
+from COGor.program_processor import em_processor, om_processor, batch_processor, parse_attributes, \
+    ATTRIBUTE_COLUMNS, GFF_COLUMNS
+from COGor.consensus import consensus, consensus_table
+from COGor.writer import write_contig_plot_files
+
+
+def pipeline(files, **options):
+    return run_pipeline(files["em"], files["cds"], files["orf"], files["cog"], files["batch"], files["gff"],
+                        files["fasta"], **options)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_empty_batch_table(no_batch_genome, workers):
+    result = pipeline(no_batch_genome, workers=workers)
+    assert len(result.batch) == 0
+    assert len(result.consensus) > 0
+    assert result.consensus.loc[result.consensus["tool"] == 2].empty
+
+
+def test_parse_attributes_of_empty_table():
+    data = parse_attributes(pd.DataFrame(columns=GFF_COLUMNS))
+    assert all(column in data for column in ATTRIBUTE_COLUMNS)
+    assert isinstance(data["COG"].dtype, pd.CategoricalDtype)
+
+
+def test_consensus_files_with_empty_batch(no_batch_genome, tmp_path):
+    files, output_dir = no_batch_genome, str(tmp_path)
+    em_processor("synth", files["em"], files["cds"], output_dir)
+    om_processor("synth", files["orf"], files["cog"], output_dir)
+    batch_processor("synth", files["batch"], output_dir)
+    consensus(*[os.path.join(output_dir, tool + "_synth.gff") for tool in ("em", "om", "batch")], files["fasta"],
+              True, True, files["gff"], output_dir)
+    with open(os.path.join(output_dir, "file_to_plot.txt"), "r") as file:
+        assert "\tCDS\t" in file.read()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_consensus_of_empty_tables(workers):
+    empty = parse_attributes(pd.DataFrame(columns=GFF_COLUMNS))
+    df = consensus_table(empty, empty, empty, workers=workers)
+    assert len(df) == 0
+    assert df.attrs["matching"] == {"exact": 0, "fuzzy": 0, "unmatched": 0}
+
+
+def test_unplaced_features_are_reported(genome, tmp_path, capsys):
+    df = pipeline(genome).consensus
+    df.loc[df.index[:5], "seqname"] = "missing_contig"
+    files = write_contig_plot_files(df, genome["fasta"], str(tmp_path))
+    assert len(files) == 3
+    assert "5 features are not saved" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("options", [{"write_intermediate": True}, {"cohort_dir": "cohort"}])
+def test_organism_name_is_required(genome, tmp_path, options):
+    output_dir = str(tmp_path / "output")
+    options = {key: str(tmp_path / value) if key == "cohort_dir" else value for key, value in options.items()}
+    with pytest.raises(ValueError, match="organism_name"):
+        pipeline(genome, output_dir=output_dir, **options)
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_consensus_keeps_categories(genome, workers):
+    result = pipeline(genome, workers=workers, feature_types=("tRNA",))
+    for column in ("COG", "CAT"):
+        assert isinstance(result.consensus[column].dtype, pd.CategoricalDtype)
+        assert set(result.em[column].cat.categories) <= set(result.consensus[column].cat.categories)
@@ -0,0 +1,61 @@
+"""
+Regression tests of the consensus decision against the original per-row implementation of consensus()
+"""
+from itertools import product
+import pandas as pd
+import pytest
+from synthetic import generate
+from COGor.consensus import decide_tool, consensus_table
+from COGor.program_processor import em_table, om_table, batch_table
+
+COGS = ["-", "COG0001", "COG0002", "COG0003"]
+
+
+def reference_tool(cogs):
+    """
+    the decision of the original per-row loop of consensus(): 0 = eggNOG-mapper, 1 = Operon-mapper,
+    2 = Batch CD-Search
+    """
+    nan = cogs.count("-")
+    idxs = [[cogs[:idx].index(item), idx] for idx, item in enumerate(cogs) if item in cogs[:idx]]
+    if nan == 0:
+        if len(idxs) != 1:
+            return 0
+        return 1 if idxs[0] == [1, 2] else 0
+    elif nan == 2:
+        return [number for number in [0, 1, 2] if number not in idxs[0]][0]
+    elif nan == 1:
+        return 1 if cogs.index("-") == 0 else 0
+    return 1
+
+
+def reference_consensus(tools_data):
+    """
+    the features chosen by the original per-row loop: the tools' tables are merged on start and the feature of
+    the chosen tool with the same start is added for each row
+    """
+    starts = [data[["start"]].assign(**{"COG_%d" % tool: data["COG"].astype(object).fillna("-").values})
+              for tool, data in enumerate(tools_data)]
+    merged = starts[0].merge(starts[1], on="start", how="outer").merge(starts[2], on="start", how="outer").fillna("-")
+    rows = []
+    for start, *cogs in merged.itertuples(index=False):
+        data = tools_data[reference_tool(cogs)]
+        rows.extend(data.loc[data["start"] == start, ["start", "source", "COG"]].astype(str).itertuples(index=False))
+    return sorted(rows)
+
+
+def test_decide_tool_all_combinations():
+    combinations = list(product(COGS, repeat=3))
+    em_cog, om_cog, batch_cog = [pd.Series(cogs) for cogs in zip(*combinations)]
+    assert decide_tool(em_cog, om_cog, batch_cog).tolist() == [reference_tool(list(cogs)) for cogs in combinations]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_consensus_matches_per_row_implementation(tmp_path, seed):
+    # one contig and no shifted starts, so matching by overlap pairs the same features as the merge on start
+    files = generate(str(tmp_path), "synth", 400, 1, seed=seed, fuzzy=0)
+    tools_data = [em_table(files["em"], files["cds"]), om_table(files["orf"], files["cog"]),
+                  batch_table(files["batch"])]
+    df = consensus_table(*tools_data)
+    assert sorted(df[["start", "source", "COG"]].astype(str).itertuples(index=False)) == \
+        reference_consensus(tools_data)
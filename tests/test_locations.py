@@ -0,0 +1,100 @@
+"""
+Property tests of the location parser against the previous parser of CDS headers (first and last number of the
+location, reverse strand for complement locations)
+"""
+import random
+import pandas as pd
+import pytest
+from COGor.locations import header_locations, parse_locations
+
+
+def previous_parser(headers):
+    """
+    start, end and strand as parsed before the shared location parser
+    """
+    location = headers.str.extract(r"\[location=([^\]]*)\]", expand=False)
+    data = pd.DataFrame({"strand": location.str.contains("complement").map({True: "-", False: "+"}),
+                         "start": location.str.extract(r"(\d+)", expand=False),
+                         "end": location.str.extract(r"(\d+)\D*$", expand=False)})
+    data = data.dropna(subset=["start", "end"])
+    return data.astype({"start": int, "end": int})
+
+
+def random_location(rnd):
+    """
+    random NCBI location with single base, between-bases, partial, joined and complement segments
+    :return: location and the list of its segments
+    """
+    n_segments = rnd.choice([1, 1, 1, 2, 3, 5])
+    position = rnd.randint(1, 10 ** rnd.randint(1, 7))
+    segments = []
+    for number in range(n_segments):
+        start, end = position, position + rnd.randint(0, 3000)
+        kind = rnd.random()
+        if kind < 0.1:
+            segments.append(str(start))
+        elif kind < 0.15:
+            segments.append("%d^%d" % (start, start + 1))
+        else:
+            segments.append(("<" if number == 0 and rnd.random() < 0.2 else "") + str(start) + ".." +
+                            (">" if number == n_segments - 1 and rnd.random() < 0.2 else "") + str(end))
+        position = end + rnd.randint(1, 500)
+    location = segments[0] if n_segments == 1 else rnd.choice(["join", "order"]) + "(" + ",".join(segments) + ")"
+    if rnd.random() < 0.5:
+        location = "complement(" + location + ")"
+    return location, segments
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_headers(seed):
+    rnd = random.Random(seed)
+    headers, expected = [], []
+    for number in range(rnd.randint(0, 300)):
+        kind = rnd.random()
+        if kind < 0.05:
+            headers.append("lcl|x_prot_%d [protein=a]" % number)
+            expected.append(None)
+        elif kind < 0.08:
+            headers.append("lcl|x_prot_%d [location=]" % number)
+            expected.append(None)
+        else:
+            location, segments = random_location(rnd)
+            headers.append("lcl|x_prot_%d [protein=p 2] [location=%s] [gbkey=CDS]" % (number, location))
+            expected.append(segments)
+    index = rnd.sample(range(10000), len(headers)) if rnd.random() < 0.5 else None
+    headers = pd.Series(headers, index=index, dtype=object)
+
+    features, segments = parse_locations(header_locations(headers))
+    previous = previous_parser(headers)
+    assert list(features.index) == list(previous.index)
+    assert features["start"].tolist() == previous["start"].tolist()
+    assert features["end"].tolist() == previous["end"].tolist()
+    assert features["strand"].tolist() == previous["strand"].tolist()
+    assert features["start"].dtype == "int64" and features["partial_start"].dtype == bool
+
+    for feature, expected_segments in zip(headers.index, expected):
+        if expected_segments is None:
+            assert feature not in features.index
+            continue
+        # between-bases locations (1^2) are two single base segments
+        n_segments = sum(2 if "^" in segment else 1 for segment in expected_segments)
+        assert features.loc[feature, "segments"] == n_segments
+        assert len(segments[segments["feature"] == feature]) == n_segments
+        assert features.loc[feature, "partial_start"] == expected_segments[0].startswith("<")
+        assert features.loc[feature, "partial_end"] == (">" in expected_segments[-1])
+
+
+@pytest.mark.parametrize("location, start, end, strand, partial_start, partial_end, segments", [
+    ("1..300", 1, 300, "+", False, False, [(1, 300)]),
+    ("complement(<1..>300)", 1, 300, "-", True, True, [(1, 300)]),
+    ("42", 42, 42, "+", False, False, [(42, 42)]),
+    ("join(1..100,200..>300)", 1, 300, "+", False, True, [(1, 100), (200, 300)]),
+    ("complement(join(<1..100,200..300))", 1, 300, "-", True, False, [(1, 100), (200, 300)]),
+    ("join(complement(200..300),complement(1..100))", 1, 300, "-", False, False, [(1, 100), (200, 300)]),
+    ("order(complement(200..>300),complement(<1..100))", 1, 300, "-", True, True, [(1, 100), (200, 300)]),
+])
+def test_locations(location, start, end, strand, partial_start, partial_end, segments):
+    features, parsed = parse_locations(pd.Series([location]))
+    assert features.iloc[0][["start", "end", "strand", "partial_start", "partial_end", "segments"]].tolist() == \
+        [start, end, strand, partial_start, partial_end, len(segments)]
+    assert list(zip(parsed["start"], parsed["end"])) == segments
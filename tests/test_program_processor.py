@@ -0,0 +1,18 @@
+import pytest
+from COGor.program_processor import batch_merger
+
+
+def test_batch_merger(genome, tmp_path):
+    merged = batch_merger("synth", genome["batch"], genome["batch"], output_dir=str(tmp_path))
+    with open(genome["batch"]) as file:
+        queries = [line for line in file if line.startswith("Q#")]
+    with open(merged) as file:
+        assert len(file.readlines()) == 2 * len(queries)
+
+
+def test_batch_merger_output_dir_is_keyword_only(genome, tmp_path):
+    with pytest.raises(TypeError, match="output_dir="):
+        batch_merger("synth", genome["batch"], genome["batch"], str(tmp_path))
+    # a missing directory is not taken for the output directory either, it is a missing hitdata file
+    with pytest.raises(FileNotFoundError, match="out"):
+        batch_merger("synth", genome["batch"], genome["batch"], str(tmp_path / "out"), output_dir=str(tmp_path))
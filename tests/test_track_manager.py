@@ -0,0 +1,39 @@
+import os
+from COGor.track_manager import get_track_template, get_legend, track_template_text
+
+
+def test_assets_are_linked_into_output(tmp_path):
+    asset_dir = str(tmp_path / "assets")
+    for output in ("g1", "g2"):
+        os.makedirs(tmp_path / output)
+        for _ in range(2):
+            get_track_template(output_dir=str(tmp_path / output), asset_dir=asset_dir)
+            get_legend(str(tmp_path / output), asset_dir, "svg")
+    assert len(os.listdir(asset_dir)) == 2
+    for output in ("g1", "g2"):
+        assert sorted(os.listdir(tmp_path / output)) == ["legend.svg", "track_template"]
+        with open(tmp_path / output / "track_template", "r") as file:
+            assert file.read() == track_template_text()
+
+
+def test_track_template():
+    rows = [line.split("\t") for line in track_template_text((0.5, 0.4, 0.3, 0.2), 7.0).splitlines()]
+    assert len(rows) == 84 and all(len(row) == 10 for row in rows)
+    assert [row[0] for row in rows[-3:]] == ["0.2"] * 3 and {row[1] for row in rows} == {"7.0"}
+
+
+def test_track_template_keeps_written_values(tmp_path):
+    asset_dir = str(tmp_path / "assets")
+    for output, size in (("a", 10.0), ("b", 10)):
+        os.makedirs(tmp_path / output)
+        get_track_template(size=size, output_dir=str(tmp_path / output), asset_dir=asset_dir)
+    for output, size in (("a", "10.0"), ("b", "10")):
+        with open(tmp_path / output / "track_template", "r") as file:
+            assert {line.split("\t")[1] for line in file.read().splitlines()} == {size}
+    sizes = set()
+    for asset in os.listdir(asset_dir):
+        with open(os.path.join(asset_dir, asset), "r") as file:
+            sizes.add(file.readline().split("\t")[1])
+    assert sizes == {"10.0", "10"}
+    assert track_template_text((1, 0.9, 0.85, 0.8)).startswith("1\t")
+    assert track_template_text((1.0, 0.9, 0.85, 0.8)).startswith("1.0\t")
@@ -0,0 +1,75 @@
+import json
+import os
+import signal
+import threading
+import time
+from COGor import watcher
+from COGor.runner import INPUT_SUFFIXES
+
+
+def add_genome(input_dir, organism_name):
+    for suffix in INPUT_SUFFIXES.values():
+        with open(os.path.join(input_dir, organism_name + suffix), "w") as file:
+            file.write(organism_name + "\n")
+
+
+def fake_run_genome(organism_name, input_dir, output_dir, **options):
+    """
+    the worker of 'crash' dies, other genomes record the start and the end of their processing
+    """
+    if organism_name == "crash":
+        os._exit(1)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "runs.txt"), "a") as file:
+        file.write("start %f\n" % time.time())
+        time.sleep(options.get("delay", 0))
+        file.write("end %f\n" % time.time())
+    return 0.0
+
+
+def run_watch(monkeypatch, input_dir, output_dir, duration, jobs=1, **options):
+    """
+    run the watch service with fake_run_genome for the given time
+    """
+    monkeypatch.setattr(watcher, "run_genome", fake_run_genome)
+    timer = threading.Timer(duration, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    try:
+        return watcher.watch(input_dir, output_dir, jobs=jobs, interval=0.05, **options)
+    finally:
+        timer.cancel()
+
+
+def test_dead_worker_restarts_pool(monkeypatch, tmp_path):
+    input_dir = str(tmp_path / "input")
+    os.makedirs(input_dir)
+    for organism_name in ("crash", "g1", "g2"):
+        add_genome(input_dir, organism_name)
+    status_file = str(tmp_path / "status.json")
+    results = {name: error for name, seconds, error in run_watch(monkeypatch, input_dir, str(tmp_path / "out"), 3,
+                                                                 status_file=status_file)}
+    assert results["crash"].startswith("BrokenProcessPool")
+    assert results["g1"] is None and results["g2"] is None
+    with open(status_file, "r") as file:
+        status = json.load(file)
+    assert status["done"] == 2 and status["failed"] == ["crash"] and status["queue_depth"] == 0
+
+
+def test_changed_genome_is_not_processed_twice_at_once(monkeypatch, tmp_path):
+    input_dir, output_dir = str(tmp_path / "input"), str(tmp_path / "out")
+    os.makedirs(input_dir)
+    add_genome(input_dir, "g1")
+
+    def change():
+        # the files change while the genome is running
+        time.sleep(0.5)
+        add_genome(input_dir, "g1")
+        with open(os.path.join(input_dir, "g1_cds.txt"), "a") as file:
+            file.write("changed\n")
+
+    threading.Thread(target=change).start()
+    run_watch(monkeypatch, input_dir, output_dir, 4, jobs=2, delay=1)
+    with open(os.path.join(output_dir, "g1", "runs.txt"), "r") as file:
+        events = [line.split() for line in file]
+    assert [event for event, at in events] == ["start", "end", "start", "end"]
+    assert float(events[1][1]) <= float(events[2][1])